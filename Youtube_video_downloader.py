@@ -3,13 +3,42 @@ import os
 import sys
 import re
 import json
+import copy
+import logging
+import sqlite3
+import hashlib
+import mmap
+import queue
+import shutil
+import subprocess
+import tempfile
 import threading
-from datetime import datetime
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, urljoin
+
+try:
+    import fcntl  # reflinks on Linux
+except ImportError:  # Windows
+    fcntl = None
 
 # --- Third-Party Imports ---
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import yt_dlp
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.postprocessor import FFmpegMergerPP
+from yt_dlp.utils import PostProcessingError, download_range_func
+
+try:
+    import xxhash  # optional: much faster than the cryptographic hashes
+except ImportError:
+    xxhash = None
 
 
 # --- Windows dark/light mode detection ---
@@ -75,9 +104,6 @@ COLORS = DARK_COLORS if USE_DARK else LIGHT_COLORS
 
 
 # --- Resource extraction for ffmpeg.exe (for onefile PyInstaller) ---
-import tempfile
-import shutil
-
 def extract_ffmpeg():
     """Extract ffmpeg.exe from bundled data to a temp directory and return its path."""
     if hasattr(sys, '_MEIPASS'):
@@ -99,40 +125,6 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-# Set up the main window
-root = tk.Tk()
-root.title("YouTube Video Downloader")
-root.geometry("550x400")
-root.resizable(False, False)
-root.configure(bg=COLORS["bg"])
-
-# Style configuration
-style = ttk.Style()
-style.theme_use('clam')
-style.configure("TCombobox",
-                fieldbackground=COLORS["entry_bg"],
-                background=COLORS["bg"],
-                font=("Segoe UI", 11),
-                foreground=COLORS["fg"])
-style.configure("TProgressbar",
-                thickness=10,
-                troughcolor=COLORS["progress_trough"],
-                background=COLORS["progress_bg"],
-                bordercolor=COLORS["progress_trough"])
-# --- Pill-shaped button style (ttk limitation: corners may not be truly rounded on Windows) ---
-# This style increases padding and removes border for a modern look, but true pill/rounded corners require a custom widget or third-party library.
-style.configure("Pill.TButton",
-    font=("Segoe UI", 10),
-    background=COLORS["button_bg"],
-    foreground=COLORS["button_fg"],
-    padding=(18, 8),  # More horizontal and vertical padding
-    borderwidth=0,
-    relief="flat"
-)
-style.map("Pill.TButton",
-    background=[("active", COLORS["button_active"]), ("!active", COLORS["button_bg"])],
-    foreground=[("disabled", COLORS["disabled_fg"]), ("!disabled", COLORS["button_fg"])])
-# Note: True rounded corners are not supported by ttk on Windows. For a more modern look, consider using a custom image or a third-party widget.
 
 # --- Custom style for rounded entry fields ---
 
@@ -150,14 +142,6 @@ class RoundedEntry(tk.Entry):
         )
 
 
-# Set app icon if available
-try:
-    if os.path.exists("icon.ico"):
-        root.iconbitmap("icon.ico")
-
-except Exception as e:
-    print("Icon not set:", e)
-
 # Function to browse folder
 def browse_folder():
     folder_selected = filedialog.askdirectory()
@@ -165,33 +149,67 @@ def browse_folder():
         download_path.set(folder_selected)
 
 # Download video function
-# Add cancel flag as a global variable
-download_in_progress = False
-cancel_download = False
+# Each job has its own cancel flag (job['cancel']) and progress. The main
+# window shows one running job at a time: the one started last, then the one
+# before it once that finishes.
+shown_jobs = []  # running jobs, oldest first
+shown_jobs_lock = threading.Lock()
+
+
+def show_job(job):
+    with shown_jobs_lock:
+        shown_jobs.append(job)
+
+
+def release_job(job):
+    with shown_jobs_lock:
+        shown_jobs[:] = [other for other in shown_jobs if other is not job]
+
+
+def shown_job():
+    with shown_jobs_lock:
+        return shown_jobs[-1] if shown_jobs else None
+
+
+def job_ui(job, func):
+    """Run func on the Tk thread if job is the one the main window shows."""
+    if shown_job() is job:
+        root.after(0, func)
+
 
 def cancel_download_task():
-    global cancel_download, download_in_progress
-    if download_in_progress:
-        cancel_download = True
-        status_label.config(text="Cancelling download...", fg="orange")
-        root.update()
-        # Reset progress bar and label immediately
-        progress_bar.configure(value=0)
-        progress_label.config(text="")
-        # Switch button back to Download after cancelling
+    job = shown_job()
+    if job is None:
+        return
+    scheduler.cancel(job)
+    status_label.config(text="Cancelling download...", fg="orange")
+    root.update()
+    # Reset progress bar and label immediately
+    progress_bar.configure(value=0)
+    progress_label.config(text="")
+    # Switch button back to Download after cancelling, unless other jobs go on
+    if not scheduler.has_other_work():
         set_unified_btn_mode("download")
         unified_btn.config(state="normal")
 
 def download_video():
+    job = build_job()
+    if job is None:
+        return
+    submit_job(job)
+
+def submit_job(job):
     # Show "Collecting Information..." label immediately after Download is clicked
     global collecting_label
     collecting_label.config(text="Collecting Information...")
     collecting_label.grid(row=4, column=0, pady=(0, 2), sticky="n")
 
-    # Create a thread for download operation
-    download_thread = threading.Thread(target=download_task)
-    download_thread.daemon = True
-    download_thread.start()
+    # The scheduler starts the job in its own thread when a slot is free
+    scheduler.submit(job)
+    pending = scheduler.pending_count()
+    if pending:
+        status_icon_label.config(text="ℹ️", fg=COLORS["status_info"])
+        status_label.config(text=f"Queued ({pending} waiting)", fg=COLORS["status_info"])
 
 
 def is_valid_youtube_url(url):
@@ -227,153 +245,2735 @@ from datetime import datetime
 
 # Add after global variables
 HISTORY_FILE = "download_history.json"
+HISTORY_DB = "download_history.db"
 SETTINGS_FILE = "settings.json"
 
 
+# --- Download history: SQLite store with full-text search over title and URL ---
+HISTORY_PAGE_SIZE = 200      # rows fetched per query while scrolling
+HISTORY_CACHED_PAGES = 4
+HISTORY_SEARCH_DELAY = 150   # ms after the last keystroke before searching
+HISTORY_OPTION_KEYS = ('folder', 'format', 'quality', 'custom_name', 'is_playlist',
+                       'playlist_start', 'playlist_end', 'sidecars', 'hash', 'live_mode', 'live_split',
+                       'clip', 'exact_cuts', 'fragments', 'library')
+
+
+class HistoryStore:
+    """Unbounded download history in SQLite, indexed for search with FTS5.
+
+    Download workers insert while the history window queries, so the one
+    connection is shared and every statement runs under a lock.
+    """
+
+    def __init__(self, path=HISTORY_DB, legacy_file=HISTORY_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS downloads (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    url TEXT,
+                    filename TEXT,
+                    title TEXT,
+                    format TEXT,
+                    quality TEXT,
+                    options TEXT
+                );
+                CREATE INDEX IF NOT EXISTS downloads_date ON downloads(date);
+                CREATE INDEX IF NOT EXISTS downloads_format ON downloads(format, quality);
+                CREATE TABLE IF NOT EXISTS files (
+                    download_id INTEGER NOT NULL REFERENCES downloads(id) ON DELETE CASCADE,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    algorithm TEXT,
+                    digest TEXT
+                );
+                CREATE INDEX IF NOT EXISTS files_download ON files(download_id);
+            """)
+            self.fts = self._create_fts()
+        self._import_legacy(legacy_file)
+
+    def _create_fts(self):
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts USING fts5(
+                    title, url, content='downloads', content_rowid='id', prefix='2 3');
+                CREATE TRIGGER IF NOT EXISTS downloads_ai AFTER INSERT ON downloads BEGIN
+                    INSERT INTO downloads_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_ad AFTER DELETE ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, title, url)
+                    VALUES ('delete', old.id, old.title, old.url);
+                END;
+                CREATE TRIGGER IF NOT EXISTS downloads_au AFTER UPDATE OF title, url ON downloads BEGIN
+                    INSERT INTO downloads_fts(downloads_fts, rowid, title, url)
+                    VALUES ('delete', old.id, old.title, old.url);
+                    INSERT INTO downloads_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE, which scans
+            print(f"History search index unavailable: {e}")
+            return False
+
+    def _import_legacy(self, legacy_file):
+        """Move the old JSON history into the database once."""
+        if not legacy_file or not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                history = json.load(f)
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO downloads (date, url, filename, title, format, quality) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(item['date'], item.get('url'), item.get('filename'),
+                      item.get('title', os.path.basename(item.get('filename', ''))),
+                      item.get('format'), item.get('quality')) for item in history])
+            os.replace(legacy_file, legacy_file + ".imported")
+        except Exception as e:
+            print(f"Error importing history: {e}")
+
+    def add(self, record):
+        options = record.get('options')
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO downloads (date, url, filename, title, format, quality, options) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record['date'], record['url'], record['filename'], record['title'],
+                 record['format'], record['quality'], json.dumps(options) if options is not None else None))
+            self.conn.executemany(
+                "INSERT INTO files (download_id, path, size, algorithm, digest) VALUES (?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, f['path'], f['size'], f['algorithm'], f['digest'])
+                 for f in record.get('files') or ()])
+            return cursor.lastrowid
+
+    def get(self, record_id):
+        with self.lock:
+            return self.conn.execute("SELECT * FROM downloads WHERE id = ?", (record_id,)).fetchone()
+
+    def files(self, record_ids=None):
+        """Hashed files of the given records, or of the whole history."""
+        sql = "SELECT f.*, d.title FROM files f JOIN downloads d ON d.id = f.download_id"
+        with self.lock:
+            if record_ids is None:
+                return [dict(row) for row in self.conn.execute(sql)]
+            rows = []
+            for record_id in record_ids:
+                rows += [dict(row) for row in self.conn.execute(sql + " WHERE f.download_id = ?", (record_id,))]
+            return rows
+
+    def delete(self, record_ids):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM downloads WHERE id = ?", [(i,) for i in record_ids])
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM downloads")
+
+    def distinct(self, column):
+        if column not in ('format', 'quality'):
+            raise ValueError(column)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT DISTINCT {column} FROM downloads WHERE {column} IS NOT NULL ORDER BY {column}")
+            return [row[0] for row in rows]
+
+    def _query(self, filters):
+        """FROM/WHERE clause, parameters and newest-first ordering for the search text and filters."""
+        clauses, params = [], []
+        tokens = re.findall(r"\w+", filters.get('text', ''))
+        if tokens and self.fts:
+            # Prefix match on every word. CROSS JOIN keeps the index driving the
+            # plan, and FTS5 returns rowids in order, so nothing gets sorted.
+            source = "downloads_fts f CROSS JOIN downloads d ON d.id = f.rowid"
+            order = "f.rowid DESC"
+            clauses.append("downloads_fts MATCH ?")
+            params.append(' '.join(f'"{token}"*' for token in tokens))
+        else:
+            source = "downloads d"
+            order = "d.id DESC"
+            for token in tokens:
+                clauses.append("(d.title LIKE ? OR d.url LIKE ?)")
+                params += [f"%{token}%"] * 2
+        if filters.get('date_from'):
+            clauses.append("d.date >= ?")
+            params.append(filters['date_from'].strftime("%Y-%m-%d"))
+        if filters.get('date_to'):
+            clauses.append("d.date < ?")
+            params.append((filters['date_to'] + timedelta(days=1)).strftime("%Y-%m-%d"))
+        for column in ('format', 'quality'):
+            if filters.get(column):
+                clauses.append(f"d.{column} = ?")
+                params.append(filters[column])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return f"FROM {source}{where}", params, order
+
+    def count(self, filters):
+        sql, params, _ = self._query(filters)
+        with self.lock:
+            return self.conn.execute(f"SELECT count(*) {sql}", params).fetchone()[0]
+
+    def page(self, filters, offset, limit):
+        """Matching records, newest first."""
+        sql, params, order = self._query(filters)
+        with self.lock:
+            return self.conn.execute(f"SELECT d.* {sql} ORDER BY {order} LIMIT ? OFFSET ?",
+                                     params + [limit, offset]).fetchall()
+
+
+def parse_history_date(text):
+    try:
+        return datetime.strptime(text.strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def job_from_history(record):
+    """Rebuild the job a history record was downloaded with (older records only know format and quality)."""
+    options = json.loads(record['options']) if record['options'] else {}
+    is_playlist = options.get('is_playlist', False)
+    return {
+        'url': record['url'],
+        'folder': options.get('folder') or download_path.get().strip(),
+        'format': options.get('format', record['format']),
+        'quality': options.get('quality', record['quality']),
+        'custom_name': options.get('custom_name', ""),
+        'clip': options.get('clip', ""),
+        'exact_cuts': options.get('exact_cuts', False),
+        'is_playlist': is_playlist,
+        'playlist_start': options.get('playlist_start', ""),
+        'playlist_end': options.get('playlist_end', ""),
+        'sidecars': options.get('sidecars', False),
+        'hash': options.get('hash'),
+        'live_mode': options.get('live_mode'),
+        'live_split': options.get('live_split'),
+        'fragments': options.get('fragments'),
+        'library': options.get('library'),
+        'priority': PRIORITY_BULK if is_playlist else PRIORITY_INTERACTIVE,
+    }
+
+
 def show_history():
     history_window = tk.Toplevel(root)
     history_window.title("Download History")
-    history_window.geometry("700x400")
+    history_window.geometry("760x460")
     history_window.configure(bg="#fdfdfd")
 
     # Position the history window to the right of the main window
     root_x, root_y, root_width = root.winfo_x(), root.winfo_y(), root.winfo_width()
-    history_window.geometry(f"700x400+{root_x + root_width + 10}+{root_y}")
+    history_window.geometry(f"760x460+{root_x + root_width + 10}+{root_y}")
 
     main_frame = tk.Frame(history_window, bg="#fdfdfd")
     main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    filter_frame = tk.Frame(main_frame, bg="#fdfdfd")
+    filter_frame.pack(fill=tk.X, pady=(0, 5))
     button_frame = tk.Frame(main_frame, bg="#fdfdfd")
     button_frame.pack(fill=tk.X, pady=(0, 5))
 
+    all_formats, all_qualities = "All formats", "All qualities"
+    search_var = tk.StringVar()
+    date_from_var = tk.StringVar()
+    date_to_var = tk.StringVar()
+    format_filter_var = tk.StringVar(value=all_formats)
+    quality_filter_var = tk.StringVar(value=all_qualities)
+
+    tk.Label(filter_frame, text="Search", bg="#fdfdfd").pack(side=tk.LEFT)
+    search_entry = ttk.Entry(filter_frame, textvariable=search_var, width=26)
+    search_entry.pack(side=tk.LEFT, padx=(4, 10))
+    tk.Label(filter_frame, text="From", bg="#fdfdfd").pack(side=tk.LEFT)
+    date_from_entry = tk.Entry(filter_frame, textvariable=date_from_var, width=11)
+    date_from_entry.pack(side=tk.LEFT, padx=(4, 6))
+    tk.Label(filter_frame, text="To", bg="#fdfdfd").pack(side=tk.LEFT)
+    date_to_entry = tk.Entry(filter_frame, textvariable=date_to_var, width=11)
+    date_to_entry.pack(side=tk.LEFT, padx=(4, 10))
+    format_filter = ttk.Combobox(filter_frame, textvariable=format_filter_var, state="readonly", width=18,
+                                 values=[all_formats] + history_store.distinct('format'))
+    format_filter.pack(side=tk.LEFT, padx=(0, 6))
+    quality_filter = ttk.Combobox(filter_frame, textvariable=quality_filter_var, state="readonly", width=12,
+                                  values=[all_qualities] + history_store.distinct('quality'))
+    quality_filter.pack(side=tk.LEFT)
+
     columns = ('Date', 'Filename', 'Format', 'Quality')
     tree = ttk.Treeview(main_frame, columns=columns, show='headings', selectmode='extended')
-    scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=tree.yview)
-    tree.configure(yscrollcommand=scrollbar.set)
     for col, width in zip(columns, (140, 330, 120, 80)):
         tree.heading(col, text=col)
         tree.column(col, width=width)
 
+    # Only the rows that fit in the window exist in the tree; the scrollbar
+    # works on positions in the result set and rows are fetched in pages.
+    view = {
+        'filters': {},
+        'total': 0,
+        'top': 0,
+        'visible': 1,
+        'pages': OrderedDict(),
+        'selected': set(),
+        'search_job': None,
+    }
+
+    def fetch_row(index):
+        number, position = divmod(index, HISTORY_PAGE_SIZE)
+        page = view['pages'].get(number)
+        if page is None:
+            page = history_store.page(view['filters'], number * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE)
+            view['pages'][number] = page
+            if len(view['pages']) > HISTORY_CACHED_PAGES:
+                view['pages'].popitem(last=False)
+        else:
+            view['pages'].move_to_end(number)
+        return page[position] if position < len(page) else None
+
+    def sync_selection():
+        shown = {int(item) for item in tree.get_children()}
+        selected = {int(item) for item in tree.selection()}
+        view['selected'] = (view['selected'] - shown) | selected
+
+    def render():
+        total, visible = view['total'], view['visible']
+        view['top'] = top = max(0, min(view['top'], total - visible))
+        tree.delete(*tree.get_children())
+        for index in range(top, min(top + visible, total)):
+            row = fetch_row(index)
+            if row is None:
+                break
+            tree.insert('', 'end', iid=str(row['id']), values=(
+                row['date'],
+                row['title'] or os.path.basename(row['filename'] or ''),
+                row['format'],
+                row['quality']
+            ))
+        tree.selection_set([item for item in tree.get_children() if int(item) in view['selected']])
+        if total:
+            scrollbar.set(top / total, min(1.0, (top + visible) / total))
+        else:
+            scrollbar.set(0, 1)
+
+    def scroll_to(top):
+        sync_selection()
+        view['top'] = int(top)
+        render()
+
+    def on_scroll(action, amount, unit=None):
+        if action == 'moveto':
+            scroll_to(float(amount) * view['total'])
+        elif action == 'scroll':
+            step = view['visible'] if unit == 'pages' else 1
+            scroll_to(view['top'] + int(amount) * step)
+
+    def on_mousewheel(event):
+        if getattr(event, 'num', None) in (4, 5):
+            direction = -1 if event.num == 4 else 1
+        else:
+            direction = -1 if event.delta > 0 else 1
+        scroll_to(view['top'] + direction * 3)
+        return "break"
+
+    def on_resize(event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        visible = max(1, (event.height - 25) // row_height)
+        if visible != view['visible']:
+            sync_selection()
+            view['visible'] = visible
+            render()
+
+    scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=on_scroll)
+    tree.bind('<Configure>', on_resize)
+    tree.bind('<MouseWheel>', on_mousewheel)
+    tree.bind('<Button-4>', on_mousewheel)
+    tree.bind('<Button-5>', on_mousewheel)
+
     def handle_click(event):
         if not tree.identify_row(event.y):
+            view['selected'].clear()
             for selected_item in tree.selection():
                 tree.selection_remove(selected_item)
+        elif not event.state & 0x5:
+            # A plain click replaces the selection, including rows scrolled out of view
+            view['selected'].clear()
     tree.bind('<Button-1>', handle_click)
 
-    # Efficient history loading
-    try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r') as f:
-                history = json.load(f)
-                for item in reversed(history):
-                    tree.insert('', 'end', values=(
-                        item['date'],
-                        item.get('title', os.path.basename(item['filename'])),
-                        item['format'],
-                        item['quality']
-                    ))
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load history: {e}")
+    def current_filters():
+        filters = {'text': search_var.get()}
+        for key, var, entry in (('date_from', date_from_var, date_from_entry),
+                                ('date_to', date_to_var, date_to_entry)):
+            text = var.get().strip()
+            filters[key] = parse_history_date(text) if text else None
+            entry.config(fg="red" if text and filters[key] is None else "black")
+        if format_filter_var.get() != all_formats:
+            filters['format'] = format_filter_var.get()
+        if quality_filter_var.get() != all_qualities:
+            filters['quality'] = quality_filter_var.get()
+        return filters
+
+    def run_search():
+        view['search_job'] = None
+        started = time.perf_counter()
+        try:
+            filters = current_filters()
+            view.update(filters=filters, total=history_store.count(filters), top=0, pages=OrderedDict())
+            view['selected'].clear()
+            render()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load history: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        result_label.config(text=f"{view['total']:,} downloads ({elapsed_ms:.0f} ms)")
+
+    def schedule_search(*_):
+        # Search as the user types, once typing pauses
+        if view['search_job'] is not None:
+            history_window.after_cancel(view['search_job'])
+        view['search_job'] = history_window.after(HISTORY_SEARCH_DELAY, run_search)
+
+    for var in (search_var, date_from_var, date_to_var, format_filter_var, quality_filter_var):
+        var.trace_add('write', schedule_search)
+
+    def selected_ids():
+        sync_selection()
+        return sorted(view['selected'])
+
+    def redownload_selected():
+        record_ids = selected_ids()
+        if not record_ids:
+            messagebox.showinfo("Info", "Please select items to download again")
+            return
+        for record_id in record_ids:
+            record = history_store.get(record_id)
+            if record is None:
+                continue
+            job = job_from_history(record)
+            if not job['folder']:
+                messagebox.showwarning("Input Error", "Please select a download folder.")
+                return
+            submit_job(job)
+
+    def verify_files():
+        # Selected downloads, or everything that was downloaded with a checksum
+        record_ids = selected_ids()
+        files = history_store.files(record_ids or None)
+        if not files:
+            messagebox.showinfo("Info", "No checksums recorded for these downloads")
+            return
+        verify_btn.config(state="disabled")
+        last_update = [0.0]
+
+        def on_result(done, _file, _status):
+            now = time.monotonic()
+            if done == len(files) or now - last_update[0] > 0.2:
+                last_update[0] = now
+                root.after(0, lambda: result_label.winfo_exists() and
+                           result_label.config(text=f"Verifying {done:,} of {len(files):,} files..."))
+
+        def report(results):
+            problems = results['changed'] + results['missing'] + results['unreadable']
+            summary = (f"{len(results['ok']):,} of {len(files):,} files match their checksum.\n"
+                       f"Changed: {len(results['changed'])}, missing: {len(results['missing'])}, "
+                       f"unreadable: {len(results['unreadable'])}, skipped: {len(results['skipped'])}")
+            if problems:
+                summary += "\n\n" + "\n".join(f["path"] for f in problems[:10])
+                messagebox.showwarning("Verify Files", summary)
+            else:
+                messagebox.showinfo("Verify Files", summary)
+            if verify_btn.winfo_exists():
+                verify_btn.config(state="normal")
+                run_search()
+
+        def verify_worker():
+            results = verify_library(files, on_result)
+            root.after(0, lambda: report(results))
+        threading.Thread(target=verify_worker, daemon=True).start()
 
     def clear_selected():
-        selected_items = tree.selection()
-        if not selected_items:
+        record_ids = selected_ids()
+        if not record_ids:
             messagebox.showinfo("Info", "Please select items to clear")
             return
         if messagebox.askyesno("Confirm", "Are you sure you want to clear selected items?"):
             try:
-                with open(HISTORY_FILE, 'r') as f:
-                    history = json.load(f)
-                selected_dates = {tree.item(item)['values'][0] for item in selected_items}
-                new_history = [item for item in history if item['date'] not in selected_dates]
-                with open(HISTORY_FILE, 'w') as f:
-                    json.dump(new_history, f, indent=2)
-                for item in selected_items:
-                    tree.delete(item)
+                history_store.delete(record_ids)
+                run_search()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to clear history: {e}")
 
     def clear_all():
         if messagebox.askyesno("Confirm", "Are you sure you want to clear all history?"):
             try:
-                with open(HISTORY_FILE, 'w') as f:
-                    json.dump([], f)
-                for item in tree.get_children():
-                    tree.delete(item)
+                history_store.clear()
+                run_search()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to clear history: {e}")
 
+    redownload_btn = ttk.Button(button_frame, text="Download Again", command=redownload_selected, style="Pill.TButton")
+    redownload_btn.pack(side=tk.LEFT, padx=5)
+    verify_btn = ttk.Button(button_frame, text="Verify Files", command=verify_files, style="Pill.TButton")
+    verify_btn.pack(side=tk.LEFT, padx=5)
     clear_selected_btn = ttk.Button(button_frame, text="Clear Selected", command=clear_selected, style="Pill.TButton")
     clear_selected_btn.pack(side=tk.LEFT, padx=5)
     clear_all_btn = ttk.Button(button_frame, text="Clear All", command=clear_all, style="Pill.TButton")
     clear_all_btn.pack(side=tk.LEFT, padx=5)
+    result_label = tk.Label(button_frame, text="", bg="#fdfdfd", fg="#666666")
+    result_label.pack(side=tk.RIGHT, padx=5)
+
+    add_tooltip(search_entry, "Search titles and URLs. Matches the start of each word.")
+    add_tooltip(date_from_entry, "First day to show (YYYY-MM-DD).")
+    add_tooltip(date_to_entry, "Last day to show (YYYY-MM-DD).")
+    add_tooltip(redownload_btn, "Queue the selected downloads again with the options they used.")
+    add_tooltip(verify_btn, "Check the selected downloads (or all of them) against their recorded checksums.")
 
     tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    run_search()
+    search_entry.focus_set()
+
+def show_alerts():
+    """Non-modal window listing worker errors and warnings, one group per job."""
+    alerts_window = tk.Toplevel(root)
+    alerts_window.title("Alerts")
+    root_x, root_y, root_width = root.winfo_x(), root.winfo_y(), root.winfo_width()
+    alerts_window.geometry(f"760x460+{root_x + root_width + 10}+{root_y}")
+    alerts_window.configure(bg="#fdfdfd")
+
+    main_frame = tk.Frame(alerts_window, bg="#fdfdfd")
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    button_frame = tk.Frame(main_frame, bg="#fdfdfd")
+    button_frame.pack(fill=tk.X, pady=(0, 5))
+    detail = tk.Text(main_frame, height=6, wrap=tk.WORD, relief=tk.FLAT, bg="#f4f4f4")
+    detail.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+
+    columns = ('Time', 'Message', 'Count')
+    tree = ttk.Treeview(main_frame, columns=columns, show='tree headings', selectmode='browse')
+    tree.heading('#0', text='Job / Event')
+    tree.column('#0', width=260)
+    for col, width in zip(columns, (70, 360, 50)):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, stretch=col == 'Message')
+    scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+
+    view = {'serial': 0, 'events': {}}
+
+    def job_row(event):
+        iid = f"job-{event['job']}"
+        if not tree.exists(iid):
+            tree.insert('', 0, iid=iid, text=event['job_label'], open=True)
+        tree.item(iid, text=event['job_label'])
+        return iid
+
+    def poll():
+        if not alerts_window.winfo_exists():
+            return
+        for event in event_bus.changed_since(view['serial']):
+            view['serial'] = max(view['serial'], event['serial'])
+            view['events'][str(event['id'])] = event
+            values = (event['time'].strftime("%H:%M:%S"), event['message'].splitlines()[0] if event['message'] else "",
+                      f"×{event['count']}" if event['count'] > 1 else "")
+            text = f"{EVENT_LEVELS.get(event['level'], '')} {event['title']}"
+            if tree.exists(str(event['id'])):
+                tree.item(str(event['id']), text=text, values=values)
+            else:
+                tree.insert(job_row(event), 'end', iid=str(event['id']), text=text, values=values)
+        event_bus.mark_seen()
+        alerts_window.after(EVENT_POLL_MS, poll)
+
+    def show_detail(_=None):
+        selected = tree.selection()
+        event = view['events'].get(selected[0]) if selected else None
+        detail.delete('1.0', tk.END)
+        if event is not None:
+            detail.insert('1.0', f"{event['job_label']}\n{event['title']}\n\n{event['message']}")
+    tree.bind('<<TreeviewSelect>>', show_detail)
+
+    def copy_selected():
+        text = detail.get('1.0', tk.END).strip()
+        if text:
+            alerts_window.clipboard_clear()
+            alerts_window.clipboard_append(text)
+
+    def clear_all():
+        event_bus.clear()
+        tree.delete(*tree.get_children())
+        view['events'].clear()
+        show_detail()
+
+    ttk.Button(button_frame, text="Copy", command=copy_selected, style="Pill.TButton").pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_frame, text="Clear All", command=clear_all, style="Pill.TButton").pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_frame, text="Close", command=alerts_window.destroy, style="Pill.TButton").pack(side=tk.RIGHT, padx=5)
+
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    poll()
+
+
+def update_alerts_button():
+    """Show the number of unread errors and warnings on the main window's Alerts button."""
+    unseen = event_bus.unseen
+    ttAlerts.config(text=f"Alerts ({unseen})" if unseen else "Alerts")
+    root.after(EVENT_POLL_MS, update_alerts_button)
 
 # Modify the save_to_history function to include title and URL
 
-def save_to_history(url, filename, format_type, quality):
+def save_to_history(url, filename, format_type, quality, options=None, files=None):
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
         title = os.path.basename(filename).replace('%(title)s', '')
-        history.append({
+        history_store.add({
             'url': url,
             'filename': filename,
             'title': title,
             'format': format_type,
             'quality': quality,
-            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'options': options,
+            'files': files,
         })
-        # Keep only last 100 entries
-        history = history[-100:]
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
     except Exception as e:
         print(f"Error saving history: {e}")
 
-def download_task():
-    global download_in_progress, cancel_download
-    global progress_max_percent
-    progress_max_percent = 0  # Reset for each download
-    cancel_download = False
-    download_in_progress = True
+# Height limit for each quality choice
+QUALITY_MAP = {
+    "2160p (4K)": 2160,
+    "1440p (2K)": 1440,
+    "1080p": 1080,
+    "720p": 720,
+    "480p": 480,
+    "360p": 360
+}
+
+
+# --- Event bus: worker threads report problems without waiting on a dialog ---
+# Tk must only be touched from the main thread, and a modal dialog would hold
+# the worker until someone clicks OK. Workers publish here instead; the
+# Alerts window reads the log on the Tk thread.
+EVENT_LOG_SIZE = 1000  # events kept for the Alerts window
+EVENT_POLL_MS = 250
+EVENT_LEVELS = {'error': "✗", 'warning': "!", 'info': "✓"}
+EVENT_LOG_LEVELS = {'error': logging.ERROR, 'warning': logging.WARNING, 'info': logging.INFO}
+log = logging.getLogger("youtube_video_downloader")
+
+
+class EventBus:
+    """Thread-safe log of errors, warnings and notices, grouped per job.
+
+    publish() never blocks on the UI. A repeat of a job's previous event
+    (yt-dlp retries, for instance) bumps that event's count instead of
+    adding one. Every event also goes to the logging module, so runs
+    without the Alerts window (or without a display) still record them.
+    """
+
+    def __init__(self, max_events=EVENT_LOG_SIZE):
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=max_events)
+        self.serial = 0  # increases with every change; pollers compare it
+        self.unseen = 0  # errors and warnings nobody has looked at yet
+        self._last_by_job = {}
+        self._next_id = 0
+
+    def publish(self, level, title, message, job=None):
+        message = re.sub(r'^(?:ERROR|WARNING):\s*', '', str(message).strip())
+        job_id = job.get('id') if job else None
+        job_label = (job.get('title') or job.get('url')) if job else "General"
+        with self._lock:
+            self.serial += 1
+            last = self._last_by_job.get(job_id)
+            if last is not None and last['level'] == level and last['message'] == message:
+                last.update(count=last['count'] + 1, time=datetime.now(), serial=self.serial)
+            else:
+                self._next_id += 1
+                event = {'id': self._next_id, 'serial': self.serial, 'time': datetime.now(), 'level': level,
+                         'title': title, 'message': message, 'job': job_id, 'job_label': job_label, 'count': 1}
+                self.events.append(event)
+                self._last_by_job[job_id] = event
+            if level != 'info':
+                self.unseen += 1
+        log.log(EVENT_LOG_LEVELS.get(level, logging.INFO), "%s: %s: %s", job_label, title, message)
+
+    def forget_job(self, job):
+        """Called when a job ends: its events stay listed, only the repeat check lets go of it."""
+        with self._lock:
+            self._last_by_job.pop(job.get('id'), None)
+
+    def changed_since(self, serial):
+        """Events added or updated after serial, oldest first."""
+        with self._lock:
+            return [dict(event) for event in self.events if event['serial'] > serial]
+
+    def mark_seen(self):
+        with self._lock:
+            self.unseen = 0
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._last_by_job.clear()
+            self.unseen = 0
+            self.serial += 1
+
+
+def report_job_failure(job, title, message):
+    """Publish why a job stopped and reset the main window once nothing else is running."""
+    event_bus.publish('error', title, message, job)
+    # Asked here, while this job still counts as active
+    others_running = scheduler.has_other_work()
+
+    def show_failure():
+        status_icon_label.config(text="✗", fg=COLORS["status_error"])
+        status_label.config(text=f"{title} (see Alerts)", fg=COLORS["status_error"])
+        if others_running:
+            return
+        progress_bar.configure(value=0)
+        progress_label.config(text="")
+        speed_label.config(text="")
+        set_unified_btn_mode("download")
+        unified_btn.config(state="normal")
+    job_ui(job, show_failure)
+
+
+# --- Job scheduler: priorities, per-source fairness and per-host caps ---
+# Single videos are interactive jobs and always go first; playlists are bulk jobs.
+# Bulk jobs only give up their slot between playlist entries, never mid-file.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+MAX_ACTIVE_JOBS = 3
+# Keep the number of simultaneous jobs per site low to avoid rate limiting
+HOST_CONCURRENCY_CAPS = {
+    "youtube.com": 2,
+    "facebook.com": 1,
+}
+DEFAULT_HOST_CAP = 2
+
+
+def get_job_host(url):
+    """Return a normalized host name used for per-host concurrency caps."""
+    netloc = urlparse(url if '//' in url else '//' + url).netloc.lower()
+    host = netloc.rsplit('@', 1)[-1].split(':')[0]
+    for prefix in ('www.', 'm.', 'web.', 'mobile.', 'player.', 'touch.', 'vm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if host in ('youtu.be', 'youtube-nocookie.com'):
+        host = 'youtube.com'
+    return host
+
+
+def get_job_source(url, host):
+    """Return the fairness key: the playlist id if there is one, else the host."""
+    match = re.search(r'[?&]list=([\w-]+)', url)
+    if match:
+        return f"{host}:{match.group(1)}"
+    return host
+
+
+class JobScheduler:
+    """Admits download jobs by priority, round-robin across sources, within host caps.
+
+    Each admitted job runs in its own daemon thread. A running bulk job calls
+    entry_boundary() between playlist entries; if a waiting job needs its slot
+    the bulk job is parked there until the scheduler resumes it. Both limits
+    are multiplied by scale() (the number of usable network paths).
+    """
+
+    def __init__(self, runner, max_active=MAX_ACTIVE_JOBS, host_caps=None, default_host_cap=DEFAULT_HOST_CAP,
+                 scale=None):
+        self.runner = runner
+        self.max_active = max_active
+        self.scale = scale
+        self.host_caps = dict(host_caps or {})
+        self.default_host_cap = default_host_cap
+        self._lock = threading.Lock()
+        # priority -> OrderedDict(source -> deque of jobs); source order is the round-robin order
+        self._queues = {PRIORITY_INTERACTIVE: OrderedDict(), PRIORITY_BULK: OrderedDict()}
+        self._active = 0
+        self._active_per_host = {}
+        self._next_id = 0
+
+    def submit(self, job):
+        job.setdefault('host', get_job_host(job['url']))
+        job.setdefault('source', get_job_source(job['url'], job['host']))
+        job['resume'] = threading.Event()
+        job['cancel'] = threading.Event()
+        job['thread'] = None
+        with self._lock:
+            self._next_id += 1
+            job.setdefault('id', self._next_id)  # groups this job's events in the Alerts window
+            self._enqueue(job)
+            self._dispatch()
+
+    def has_work(self):
+        with self._lock:
+            return self._active > 0 or any(self._queues.values())
+
+    def has_other_work(self):
+        """has_work() as seen from inside a running job."""
+        with self._lock:
+            return self._active > 1 or any(self._queues.values())
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(q) for sources in self._queues.values() for q in sources.values())
+
+    def cancel(self, job):
+        """Set the job's cancel flag. If it is queued it is dropped; a parked job
+        is resumed so it can see the flag."""
+        job['cancel'].set()
+        with self._lock:
+            sources = self._queues[job['priority']]
+            waiting = sources.get(job['source'])
+            if not waiting or not any(other is job for other in waiting):
+                return
+            sources[job['source']] = deque(other for other in waiting if other is not job)
+            if not sources[job['source']]:
+                del sources[job['source']]
+            if job['thread'] is not None:
+                self._acquire(job)
+                job['resume'].set()
+
+    def entry_boundary(self, job):
+        """Yield point between playlist entries. Blocks while the job is parked."""
+        with self._lock:
+            if not self._should_yield(job):
+                return
+            job['resume'].clear()
+            self._release(job)
+            self._enqueue(job, front=True)
+            self._dispatch()
+        job['resume'].wait()
+
+    def _scale(self):
+        return self.scale() if self.scale is not None else 1
+
+    def _host_cap(self, host):
+        return self.host_caps.get(host, self.default_host_cap) * self._scale()
+
+    def _enqueue(self, job, front=False):
+        sources = self._queues[job['priority']]
+        waiting = sources.pop(job['source'], None) or deque()
+        if front:
+            waiting.appendleft(job)
+        else:
+            waiting.append(job)
+        # (Re)inserting moves the source to the back of the round-robin order
+        sources[job['source']] = waiting
+
+    def _can_start(self, job):
+        return self._active_per_host.get(job['host'], 0) < self._host_cap(job['host'])
+
+    def _pick(self):
+        for priority in sorted(self._queues):
+            sources = self._queues[priority]
+            for source, waiting in list(sources.items()):
+                job = waiting[0]
+                if not self._can_start(job):
+                    continue
+                waiting.popleft()
+                del sources[source]
+                if waiting:
+                    sources[source] = waiting
+                return job
+        return None
+
+    def _acquire(self, job):
+        self._active += 1
+        self._active_per_host[job['host']] = self._active_per_host.get(job['host'], 0) + 1
+
+    def _release(self, job):
+        self._active -= 1
+        self._active_per_host[job['host']] -= 1
+
+    def _dispatch(self):
+        while self._active < self.max_active * self._scale():
+            job = self._pick()
+            if job is None:
+                return
+            self._acquire(job)
+            if job['thread'] is not None:
+                job['resume'].set()
+            else:
+                job['thread'] = threading.Thread(target=self._run, args=(job,), daemon=True)
+                job['thread'].start()
+
+    def _should_yield(self, job):
+        # A waiting job is only blocked by capacity (otherwise _dispatch would have
+        # started it), so yield if giving up this slot would let it run.
+        for priority, sources in self._queues.items():
+            if priority > job['priority']:
+                continue
+            for source, waiting in sources.items():
+                if priority == job['priority'] and source == job['source']:
+                    continue
+                other = waiting[0]
+                if self._active >= self.max_active * self._scale() or (
+                        other['host'] == job['host'] and not self._can_start(other)):
+                    return True
+        return False
+
+    def _run(self, job):
+        try:
+            self.runner(job)
+        except Exception as e:
+            # The runner reports the failures it expects; this is anything else
+            event_bus.publish('error', "Job stopped unexpectedly", e, job)
+        finally:
+            with self._lock:
+                self._release(job)
+                self._dispatch()
+
+
+# --- Codec-aware container selection (stream copy only, never transcode) ---
+# Video codecs that ffmpeg can copy into MP4 and that common players accept
+H264_VCODECS = ('avc1', 'h264')
+MP4_COPY_VCODECS = H264_VCODECS + ('av01',)
+MP4_COPY_ACODECS = ('mp4a', 'aac')
+
+
+def codec_rank(vcodec):
+    """Lower is better: H.264 first, AV1 next, anything else needs MKV."""
+    vcodec = (vcodec or '').lower()
+    if vcodec.startswith(H264_VCODECS):
+        return 0
+    if vcodec.startswith(MP4_COPY_VCODECS):
+        return 1
+    return 2
+
+
+def choose_merge_container(vcodec, acodec):
+    """Return 'mp4' if both streams can be stream-copied into MP4, otherwise 'mkv'."""
+    acodec = (acodec or '').lower()
+    if codec_rank(vcodec) < 2 and acodec.startswith(MP4_COPY_ACODECS):
+        return 'mp4'
+    return 'mkv'
+
+
+def make_stream_copy_selector(max_height=None):
+    """Build a yt-dlp format selector that picks streams the merger can copy as-is.
+
+    Takes the tallest video-only stream within max_height, preferring H.264/AV1
+    at that height, pairs it with AAC audio when MP4 is possible, and sets the
+    merged container to MP4 or MKV accordingly.
+    """
+    def selector(ctx):
+        formats = ctx.get('formats') or []
+        videos = [f for f in formats if f.get('vcodec') not in (None, 'none') and f.get('acodec') == 'none'
+                  and (max_height is None or (f.get('height') or 0) <= max_height)]
+        audios = [f for f in formats if f.get('acodec') not in (None, 'none') and f.get('vcodec') == 'none']
+        if not videos or not audios:
+            # No separate streams: take the best file that has both, nothing to
+            # merge (audio-only and storyboard formats have no place here)
+            muxed = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
+            singles = [f for f in muxed if max_height is None or (f.get('height') or 0) <= max_height]
+            candidates = singles or muxed or videos
+            if candidates:
+                yield candidates[-1]
+            return
+
+        top_height = max(f.get('height') or 0 for f in videos)
+        video = min((f for f in videos if (f.get('height') or 0) == top_height),
+                    key=lambda f: (codec_rank(f.get('vcodec')), -(f.get('tbr') or 0)))
+        copy_audios = [f for f in audios if (f.get('acodec') or '').lower().startswith(MP4_COPY_ACODECS)]
+        if codec_rank(video.get('vcodec')) < 2 and copy_audios:
+            audios = copy_audios
+        audio = max(audios, key=lambda f: f.get('abr') or f.get('tbr') or 0)
+        container = choose_merge_container(video.get('vcodec'), audio.get('acodec'))
+        yield {
+            'format_id': f"{video['format_id']}+{audio['format_id']}",
+            'ext': container,
+            'requested_formats': [video, audio],
+            'protocol': f"{video.get('protocol')}+{audio.get('protocol')}",
+            'width': video.get('width'),
+            'height': video.get('height'),
+            'fps': video.get('fps'),
+            'vcodec': video.get('vcodec'),
+            'acodec': audio.get('acodec'),
+        }
+    return selector
+
+
+def make_merge_stats_hook(job):
+    """Postprocessor hook that reports the wall time and CPU time of each merge as an info event."""
+    def hook(d):
+        if d.get('postprocessor') != 'Merger':
+            return
+        if d['status'] == 'started':
+            job['_merge_start'] = (time.perf_counter(), os.times())
+        elif d['status'] == 'finished' and '_merge_start' in job:
+            started, cpu_before = job.pop('_merge_start')
+            cpu_after = os.times()
+            # ffmpeg runs as a child process, so only the children fields count
+            # (these stay 0 on Windows, where only wall time is reported)
+            cpu = (cpu_after.children_user - cpu_before.children_user
+                   + cpu_after.children_system - cpu_before.children_system)
+            elapsed = time.perf_counter() - started
+            name = os.path.basename((d.get('info_dict') or {}).get('filepath') or '')
+            event_bus.publish('info', "Merged", f"{name} in {elapsed:.1f}s (CPU {cpu:.1f}s)", job)
+            job_ui(job, lambda: speed_label.config(text=f"Merged in {elapsed:.1f}s (CPU {cpu:.1f}s)"))
+    return hook
+
+
+# --- Sidecars: thumbnail, subtitles and chapters embedded during the merge ---
+SIDECAR_CACHE_DIR = "sidecar_cache"
+SIDECAR_SUBTITLE_LANGS = ('en',)
+SIDECAR_WORKERS = 4
+
+
+class SidecarFetcher:
+    """Fetches small assets in a thread pool and keeps them in a content-addressed cache.
+
+    Files are stored once under objects/<sha256><ext>; index.json maps a stable
+    key (extractor, video id, asset) to the stored file, so an asset already
+    fetched for another playlist or an earlier download is not fetched again.
+    Requests go through a pooled YoutubeDL session built with the job's
+    network options, so its proxy, source address and cookies apply and
+    keep-alive connections are reused.
+    """
+
+    def __init__(self, cache_dir=SIDECAR_CACHE_DIR, max_workers=SIDECAR_WORKERS):
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sidecar')
+        self._lock = threading.Lock()
+        self._index = None
+
+    def fetch(self, key, url, ext, job=None, opts=None, headers=None):
+        """Return a Future resolving to the cached file path (or None on failure).
+
+        opts are the job's YoutubeDL options (only the network ones are used)
+        and headers the asset's own http_headers.
+        """
+        return self._executor.submit(self._fetch, key, url, ext, job, opts or {}, headers or {})
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_file, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _cached_path(self, key):
+        with self._lock:
+            name = self._load_index().get(key)
+        if name:
+            path = os.path.join(self.cache_dir, 'objects', name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _fetch(self, key, url, ext, job, opts, headers):
+        path = self._cached_path(key)
+        if path:
+            return path
+        try:
+            data = self._get(url, opts, headers)
+        except Exception as e:
+            # The video still downloads; it just goes without this extra
+            event_bus.publish('warning', "Couldn't fetch thumbnail or subtitles", f"{key}: {e}", job)
+            return None
+        name = hashlib.sha256(data).hexdigest() + ext
+        path = os.path.join(self.cache_dir, 'objects', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._load_index()[key] = name
+            with open(self.index_file, 'w') as f:
+                json.dump(self._index, f)
+        return path
+
+    def _get(self, url, opts, headers):
+        # Read when the fetch starts, so a job moved to another network path is followed
+        session_opts = {k: opts[k] for k in SESSION_PROFILE_OPTS if k in opts}
+        with ydl_pool.session(session_opts) as ydl:
+            with ydl.urlopen(Request(url, headers=headers)) as response:
+                return response.read()
+
+
+def pick_jpeg_thumbnail(info):
+    """Best thumbnail that is a JPEG (WebP cannot be an MP4 cover)."""
+    for thumb in reversed(info.get('thumbnails') or []):
+        url = thumb.get('url') or ''
+        if urlparse(url).path.lower().endswith(('.jpg', '.jpeg')):
+            return thumb
+    return None
+
+
+def start_sidecar_fetch(info, job=None, opts=None):
+    """Start fetching the thumbnail and subtitles of one video. Returns {kind: future}."""
+    base_key = f"{info.get('extractor_key', 'generic')}:{info.get('id')}"
+    futures = {}
+    thumb = pick_jpeg_thumbnail(info)
+    if thumb:
+        futures['thumbnail'] = sidecar_fetcher.fetch(f"{base_key}:thumbnail", thumb['url'], '.jpg',
+                                                     job, opts, thumb.get('http_headers'))
+    for lang in SIDECAR_SUBTITLE_LANGS:
+        for sub in (info.get('subtitles') or {}).get(lang) or []:
+            if sub.get('ext') == 'vtt' and sub.get('url'):
+                futures[f'sub:{lang}'] = sidecar_fetcher.fetch(f"{base_key}:sub:{lang}.vtt", sub['url'], '.vtt',
+                                                               job, opts, sub.get('http_headers'))
+                break
+    return futures
+
+
+def write_chapters_metadata(info, path):
+    """Write title and chapters in ffmpeg's FFMETADATA format."""
+    def escape(value):
+        return re.sub(r'([=;#\\\n])', r'\\\1', str(value))
+    lines = [';FFMETADATA1', f"title={escape(info.get('title', ''))}"]
+    if info.get('uploader'):
+        lines.append(f"artist={escape(info['uploader'])}")
+    for chapter in info.get('chapters') or []:
+        lines += ['[CHAPTER]', 'TIMEBASE=1/1000',
+                  f"START={int(chapter['start_time'] * 1000)}",
+                  f"END={int(chapter['end_time'] * 1000)}",
+                  f"title={escape(chapter.get('title', ''))}"]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def build_sidecar_merge_args(info, sidecars, metadata_path, first_input):
+    """Extra ffmpeg inputs and output args that add the sidecars to a merge.
+
+    The merger's own inputs (the downloaded formats) come first, so the
+    sidecar inputs are numbered from first_input.
+    """
+    is_mp4 = info.get('ext') == 'mp4'
+    video_streams = sum(1 for f in info.get('requested_formats') or [] if f.get('vcodec') != 'none')
+    inputs = [metadata_path]
+    args = ['-map_metadata', str(first_input), '-map_chapters', str(first_input)]
+    next_input = first_input + 1
+    thumb = sidecars.get('thumbnail')
+    if thumb and is_mp4:
+        inputs.append(thumb)
+        args += ['-map', f'{next_input}', f'-disposition:v:{video_streams}', 'attached_pic']
+        next_input += 1
+    elif thumb:
+        args += ['-attach', thumb, '-metadata:s:t:0', 'mimetype=image/jpeg', '-metadata:s:t:0', 'filename=cover.jpg']
+    sub_index = 0
+    for kind, path in sidecars.items():
+        if not kind.startswith('sub:'):
+            continue
+        lang = kind.split(':', 1)[1]
+        inputs.append(path)
+        args += ['-map', f'{next_input}', f'-metadata:s:s:{sub_index}', f'language={lang}']
+        next_input += 1
+        sub_index += 1
+    if sub_index:
+        # MP4 only takes mov_text subtitles; this converts text, not audio or video
+        args += ['-c:s', 'mov_text' if is_mp4 else 'webvtt']
+    return inputs, args
+
+
+class JobMergerPP(FFmpegMergerPP):
+    """The merger, with a job's extras in its single ffmpeg pass.
+
+    get_sidecars(info), if given, returns {kind: path} for the video being
+    merged; the thumbnail, subtitles and chapters become extra inputs. With a
+    hasher (an InlineHasher), an MP4 is written through a pipe and hashed on
+    its way to disk. A new instance is made for every merge.
+    """
+
+    def __init__(self, downloader, get_sidecars=None, hasher=None):
+        super().__init__(downloader)
+        self._get_sidecars = get_sidecars
+        self._hasher = hasher
+        self._sidecar_args = None
+        self._filepath = None
+
+    @classmethod
+    def pp_key(cls):
+        # Stands in for the merger: same postprocessor args and hook name
+        return FFmpegMergerPP.pp_key()
+
+    def run(self, info):
+        self._filepath = info['filepath']
+        if self._get_sidecars is None:
+            return super().run(info)
+        fd, metadata_path = tempfile.mkstemp(suffix='.ffmeta')
+        os.close(fd)
+        try:
+            write_chapters_metadata(info, metadata_path)
+            first_input = len(info['__files_to_merge'])
+            self._sidecar_args = build_sidecar_merge_args(info, self._get_sidecars(info), metadata_path, first_input)
+            return super().run(info)
+        finally:
+            os.remove(metadata_path)
+
+    def run_ffmpeg_multiple_files(self, input_paths, out_path, opts, **kwargs):
+        inputs, args = self._sidecar_args or ([], [])
+        all_inputs, all_opts = [*input_paths, *inputs], [*opts, *args]
+        # A cover (attached_pic) only survives in a regular MP4
+        if (self._hasher is not None and os.path.splitext(out_path)[1].lower() in PIPE_MUXER_ARGS
+                and 'attached_pic' not in all_opts):
+            result = self._run_ffmpeg_hashed(all_inputs, out_path, all_opts)
+        else:
+            result = super().run_ffmpeg_multiple_files(all_inputs, out_path, all_opts, **kwargs)
+        # ffmpeg dates the output after its oldest input; cached sidecars can be older than the download
+        oldest = min(os.stat(path).st_mtime for path in input_paths)
+        self.try_utime(out_path, oldest, oldest)
+        return result
+
+    def _run_ffmpeg_hashed(self, input_paths, out_path, opts):
+        # The command real_run_ffmpeg would build, minus faststart (a pipe can't seek)
+        self.check_version()
+        cmd = [self.executable, '-y', '-loglevel', 'repeat+info']
+        for number, path in enumerate(input_paths, 1):
+            cmd += [*self._configuration_args(self.basename, [f'_i{number}', '_i']),
+                    '-i', self._ffmpeg_filename_argument(path)]
+        cmd += [*opts, *self._configuration_args(self.basename, ['_o1', '_o', ''])]
+        self.write_debug(f'ffmpeg command line (output hashed): {cmd}')
+        try:
+            return run_ffmpeg_hashed(cmd, out_path, self._hasher, final=self._filepath)
+        except subprocess.CalledProcessError as e:
+            self.write_debug(e.stderr)
+            raise PostProcessingError((e.stderr.strip().splitlines() or [str(e)])[-1])
+
+
+def make_sidecar_hooks(job=None, opts=None):
+    """Progress hook that starts sidecar fetches as each video starts downloading,
+    and the get_sidecars callback JobMergerPP collects them with."""
+    pending = {}
+    lock = threading.Lock()
+
+    def progress_hook(d):
+        info = d.get('info_dict') or {}
+        video_id = info.get('id')
+        if d.get('status') == 'downloading' and video_id:
+            with lock:
+                if video_id not in pending:
+                    pending[video_id] = start_sidecar_fetch(info, job, opts)
+
+    def get_sidecars(info):
+        with lock:
+            futures = pending.pop(info.get('id'), None)
+        if futures is None:
+            futures = start_sidecar_fetch(info, job, opts)
+        sidecars = {kind: f.result() for kind, f in futures.items()}
+        return {kind: path for kind, path in sidecars.items() if path}
+
+    return progress_hook, get_sidecars
+
+
+# --- Pooled YoutubeDL sessions ---
+# Options YoutubeDL only reads when it is built (postprocessors are registered
+# with the ffmpeg location of the time, the HTTP handlers and cookie jar are
+# created). Instances are pooled per value of these; every other option is
+# applied to a pooled instance per lease.
+SESSION_PROFILE_OPTS = ('postprocessors', 'ffmpeg_location', 'proxy', 'source_address', 'cookiefile',
+                        'cookiesfrombrowser')
+SESSION_HOOK_OPTS = ('progress_hooks', 'postprocessor_hooks', 'post_hooks')
+SESSION_POOL_SIZE = 4  # idle instances kept per profile
+
+
+class PooledYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL as the pool hands it out. Lease options yt-dlp has no hook
+    for take effect here, on this instance only:
+
+    - 'merge_sidecars' (a get_sidecars callback) runs merges through JobMergerPP
+    - 'inline_hasher' (an InlineHasher) hashes the file each download writes
+      as it is written, and runs merges through JobMergerPP to hash theirs
+    - 'fragment_concurrency' (a FragmentConcurrency) sizes each download's
+      fragment threads and gates the requests they make
+    - 'cancel_event' (a threading.Event) fails every request made once it is set
+    """
+
+    def run_pp(self, pp, infodict):
+        get_sidecars = self.params.get('merge_sidecars')
+        hasher = self.params.get('inline_hasher')
+        if (get_sidecars or hasher) and type(pp) is FFmpegMergerPP:
+            pp = JobMergerPP(self, get_sidecars, hasher)
+        return super().run_pp(pp, infodict)
+
+    def dl(self, name, info, subtitle=False, test=False):
+        controller = self.params.get('fragment_concurrency')
+        if controller is not None:
+            # Fragment downloaders read this when they start their thread pool
+            self.params['concurrent_fragment_downloads'] = controller.pool_size()
+        hasher = self.params.get('inline_hasher')
+        # The formats of a merge are replaced by the merged file; that one is hashed instead
+        if (hasher is None or subtitle or test or name == '-'
+                or f".f{info.get('format_id')}." in os.path.basename(name)):
+            return super().dl(name, info, subtitle, test)
+        # What YoutubeDL.dl does, with the downloader's output file hashed as it is written
+        if not info.get('url'):
+            self.raise_no_formats(info, True)
+        fd = get_suitable_downloader(info, self.params, to_stdout=False)(self, self.params)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        open_file = fd.sanitize_open
+
+        def sanitize_open(filename, open_mode):
+            stream, filename = open_file(filename, open_mode)
+            if open_mode in ('wb', 'ab'):
+                stream = hasher.wrap(stream, filename, open_mode)
+            return stream, filename
+        fd.sanitize_open = sanitize_open
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def urlopen(self, req):
+        cancel = self.params.get('cancel_event')
+        if cancel is not None and cancel.is_set():
+            raise Exception("Cancelled")
+        # Fragment requests come through here too, before HttpFD turns a 503
+        # into a plain retry, so every throttling status is seen
+        controller = self.params.get('fragment_concurrency')
+        if controller is None:
+            return super().urlopen(req)
+        slot = controller.acquire()
+        try:
+            response = super().urlopen(req)
+        except HTTPError as e:
+            controller.release(slot)
+            if e.status in THROTTLE_STATUSES:
+                controller.throttled(f"HTTP {e.status}")
+            raise
+        except BaseException:
+            controller.release(slot)
+            raise
+        return GatedResponse(response, controller, slot)
+
+
+class YoutubeDLPool:
+    """Keeps warm YoutubeDL instances per option profile.
+
+    A warm instance keeps its extractor instances, cookie jar and keep-alive
+    HTTP connections between jobs and retries. YoutubeDL is not thread-safe,
+    so an instance is leased to one worker at a time; concurrent workers get
+    separate instances.
+    """
+
+    def __init__(self, max_idle=SESSION_POOL_SIZE):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = {}  # profile -> [YoutubeDL, ...]
+
+    @contextmanager
+    def session(self, opts):
+        profile = json.dumps({k: opts[k] for k in SESSION_PROFILE_OPTS if k in opts}, sort_keys=True, default=str)
+        with self._lock:
+            idle = self._idle.get(profile)
+            ydl = idle.pop() if idle else None
+        if ydl is None:
+            ydl = self._create(opts)
+        self._apply(ydl, opts)
+        try:
+            yield ydl
+        except BaseException:
+            # Don't hand a session that just failed to the next job
+            ydl.close()
+            raise
+        self._apply(ydl, {})
+        with self._lock:
+            idle = self._idle.setdefault(profile, [])
+            if len(idle) < self.max_idle:
+                idle.append(ydl)
+                ydl = None
+        if ydl is not None:
+            ydl.close()
+
+    def close(self):
+        with self._lock:
+            sessions = [ydl for idle in self._idle.values() for ydl in idle]
+            self._idle.clear()
+        for ydl in sessions:
+            ydl.close()
+
+    def _create(self, opts):
+        # The hooks registered at construction forward to the current lease's hooks
+        lease_hooks = {key: [] for key in SESSION_HOOK_OPTS}
+        base_opts = {k: opts[k] for k in SESSION_PROFILE_OPTS if k in opts}
+        for key in SESSION_HOOK_OPTS:
+            base_opts[key] = [lambda d, key=key: [hook(d) for hook in lease_hooks[key]]]
+        ydl = PooledYoutubeDL(base_opts)
+        ydl._pool_lease = {'hooks': lease_hooks, 'keys': set(), 'base': dict(ydl.params)}
+        return ydl
+
+    def _apply(self, ydl, opts):
+        lease = ydl._pool_lease
+        for key in SESSION_HOOK_OPTS:
+            lease['hooks'][key][:] = opts.get(key) or []
+        # Undo the previous lease's options before applying this one's
+        for key in lease['keys']:
+            if key in lease['base']:
+                ydl.params[key] = lease['base'][key]
+            else:
+                ydl.params.pop(key, None)
+        lease['keys'] = set()
+        for key, value in opts.items():
+            if key in SESSION_PROFILE_OPTS or key in SESSION_HOOK_OPTS:
+                continue
+            if key == 'outtmpl' and not isinstance(value, dict):
+                value = {**lease['base'].get('outtmpl', {}), 'default': value}
+            ydl.params[key] = value
+            lease['keys'].add(key)
+        # The format selector is built from 'format' when YoutubeDL is created;
+        # build it again for this lease, the same way
+        fmt = ydl.params.get('format')
+        if fmt in (None, '-') or callable(fmt):
+            ydl.format_selector = fmt
+        else:
+            ydl.format_selector = ydl.build_format_selector(fmt)
+
+
+# --- Network paths: source addresses and proxies shared out across jobs ---
+# network_paths.json lists the ways out, e.g.
+#   {"strategy": "least-loaded",
+#    "paths": [{"source_address": "192.0.2.10"}, {"proxy": "socks5://10.0.0.2:1080"}]}
+# Without it every job uses the system's default route.
+NETWORK_PATHS_FILE = "network_paths.json"
+PATH_STRATEGIES = ('least-loaded', 'round-robin')
+PATH_WINDOW = 2.0          # seconds of throughput per sample
+PATH_SLOW_FRACTION = 0.25  # a path this much slower than the others' median is ejected
+PATH_EJECT_SECONDS = 60    # first ejection; doubles with each ejection in a row
+PATH_EJECT_MAX = 3600
+PATH_HEALTH_URL = "https://www.youtube.com/generate_204"
+PATH_HEALTH_TIMEOUT = 10
+# Errors that mean the site or the proxy refuses this path, not that the video is unavailable
+PATH_BLOCKED_PATTERN = (r"HTTP Error (?:403|429)|Too Many Requests|not a bot|Unable to connect to proxy|"
+                        r"Tunnel connection failed|ProxyError|Connection refused|timed out")
+
+
+class NetworkPathPool:
+    """Assigns each job a network path (source address and/or proxy).
+
+    Paths are handed out least-loaded (fewest running jobs, then fastest) or
+    round-robin. A path that gets blocked, or on which a job runs much slower
+    than the jobs on other paths, is ejected for a while; a health check
+    reinstates it once a request through it succeeds again. The last usable
+    path is never ejected.
+    """
+
+    def __init__(self, paths=None, strategy='least-loaded', health_url=PATH_HEALTH_URL):
+        self.strategy = strategy if strategy in PATH_STRATEGIES else 'least-loaded'
+        self.health_url = health_url
+        self.paths = []
+        for spec in paths or [{}]:
+            opts = {key: spec.get(key) for key in ('source_address', 'proxy')} if paths else {}
+            name = spec.get('name') or ' via '.join(filter(None, (spec.get('source_address'), spec.get('proxy'))))
+            self.paths.append({'name': name or 'default', 'opts': opts, 'active': 0, 'rate': None,
+                               'job_rates': {}, 'ejected_until': 0, 'ejections': 0})
+        self._lock = threading.Lock()
+        self._next = 0
+        self._health_thread = None
+
+    @classmethod
+    def from_file(cls, path=NETWORK_PATHS_FILE):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r') as f:
+                config = json.load(f)
+            return cls(config.get('paths'), config.get('strategy', 'least-loaded'),
+                       config.get('health_url', PATH_HEALTH_URL))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error loading network paths: {e}")
+            return cls()
+
+    def healthy_count(self):
+        with self._lock:
+            return max(1, len(self._healthy()))
+
+    @contextmanager
+    def lease(self, job):
+        job['network_path'] = self._acquire()
+        try:
+            yield job['network_path']
+        finally:
+            with self._lock:
+                job['network_path']['active'] -= 1
+                job['network_path']['job_rates'].pop(job['id'], None)
+
+    def meter(self, job):
+        """Progress hook that samples the job's throughput on its current path.
+
+        Each job smooths its own samples, so jobs sharing a path don't blend
+        into one rate and a path is only judged by how its jobs do.
+        """
+        state = {'start': None, 'bytes': 0, 'seen': {}, 'path': None, 'rate': None}
+
+        def hook(d):
+            if d.get('status') != 'downloading':
+                return
+            now = time.monotonic()
+            key = d.get('tmpfilename') or d.get('filename')
+            downloaded = d.get('downloaded_bytes') or 0
+            state['bytes'] += max(0, downloaded - state['seen'].get(key, 0))
+            state['seen'][key] = downloaded
+            if state['start'] is None:
+                state['start'], state['bytes'] = now, 0
+            elif now - state['start'] >= PATH_WINDOW:
+                sample = state['bytes'] / (now - state['start'])
+                if state['path'] is not job['network_path']:
+                    state['path'], state['rate'] = job['network_path'], None
+                state['rate'] = sample if state['rate'] is None else 0.7 * state['rate'] + 0.3 * sample
+                self._record_rate(job, state['rate'])
+                state['start'], state['bytes'] = now, 0
+        return hook
+
+    def report_error(self, job, error, reassign=True):
+        """Eject the job's path if the error says it is blocked. Returns True if the job moved to another path."""
+        path = job.get('network_path')
+        if path is None or not re.search(PATH_BLOCKED_PATTERN, str(error)):
+            return False
+        with self._lock:
+            if not self._eject(path, str(error).splitlines()[0][:80]) or not reassign:
+                return False
+            path['active'] -= 1
+            path['job_rates'].pop(job['id'], None)
+            job['network_path'] = self._pick()
+            job['network_path']['active'] += 1
+        event_bus.publish('info', "Network paths", f"Moved to {job['network_path']['name']}", job)
+        return True
+
+    def _healthy(self):
+        now = time.monotonic()
+        return [p for p in self.paths if p['ejected_until'] <= now]
+
+    def _acquire(self):
+        with self._lock:
+            path = self._pick()
+            path['active'] += 1
+            return path
+
+    def _pick(self):
+        candidates = self._healthy() or [min(self.paths, key=lambda p: p['ejected_until'])]
+        # Rotating the starting point breaks ties round-robin
+        start = self._next % len(candidates)
+        self._next += 1
+        candidates = candidates[start:] + candidates[:start]
+        if self.strategy == 'round-robin':
+            return candidates[0]
+        return min(candidates, key=lambda p: (p['active'], -(p['rate'] or 0)))
+
+    def _record_rate(self, job, rate):
+        with self._lock:
+            path = job['network_path']
+            path['job_rates'][job['id']] = rate
+            # Least-loaded picks prefer the path whose best job is fastest
+            path['rate'] = max(path['job_rates'].values())
+            others = sorted(r for p in self._healthy() if p is not path for r in p['job_rates'].values())
+            if others and rate < PATH_SLOW_FRACTION * others[len(others) // 2]:
+                self._eject(path, f"slow: {format_size(rate)}/s")
+            else:
+                path['ejections'] = 0
+
+    def _eject(self, path, reason):
+        healthy = self._healthy()
+        if path not in healthy:
+            return True
+        if len(healthy) == 1:
+            return False
+        path['ejections'] += 1
+        seconds = min(PATH_EJECT_SECONDS * 2 ** (path['ejections'] - 1), PATH_EJECT_MAX)
+        path['ejected_until'] = time.monotonic() + seconds
+        path['rate'] = None
+        path['job_rates'].clear()
+        event_bus.publish('warning', "Network paths", f"{path['name']} ejected for {seconds}s ({reason})")
+        if self._health_thread is None or not self._health_thread.is_alive():
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+            self._health_thread.start()
+        return True
+
+    def _health_loop(self):
+        while True:
+            with self._lock:
+                ejected = [p for p in self.paths if p['ejected_until']]
+                if not ejected:
+                    self._health_thread = None
+                    return
+                now = time.monotonic()
+                due = [p for p in ejected if p['ejected_until'] <= now]
+                wait = min(p['ejected_until'] for p in ejected) - now
+            if not due:
+                # Paths ejected meanwhile may be due sooner
+                time.sleep(min(wait, PATH_HEALTH_TIMEOUT))
+                continue
+            for path in due:
+                healthy = self._check(path)
+                with self._lock:
+                    if healthy:
+                        path['ejected_until'] = 0
+                        event_bus.publish('info', "Network paths", f"{path['name']} reinstated")
+                    else:
+                        path['ejected_until'] = 0  # so _eject counts it as a fresh ejection
+                        if not self._eject(path, "health check failed"):
+                            event_bus.publish('info', "Network paths",
+                                              f"{path['name']} reinstated (no other path left)")
+
+    def _check(self, path):
+        # A session of its own: pooled sessions are for jobs
+        opts = {**path['opts'], 'socket_timeout': PATH_HEALTH_TIMEOUT, 'quiet': True, 'no_warnings': True}
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                with ydl.urlopen(Request(self.health_url)) as response:
+                    response.read()
+            return True
+        except Exception:
+            return False
+
+
+def network_path_opts(job):
+    """The source_address/proxy options of the path a job runs on."""
+    path = job.get('network_path')
+    return dict(path['opts']) if path is not None else {}
+
+
+# --- Inline content hashing (files are hashed as they are written) ---
+HASH_ALGORITHMS = {'sha256': hashlib.sha256, 'blake2b': hashlib.blake2b}
+HASH_CHOICES = {"Off": None, "SHA-256": 'sha256', "BLAKE2b": 'blake2b'}
+if xxhash is not None:
+    HASH_ALGORITHMS['xxh3_128'] = xxhash.xxh3_128
+    HASH_CHOICES["xxHash (XXH3)"] = 'xxh3_128'
+HASH_CHUNK = 8 * 1024 * 1024
+# ffmpeg can write these to a pipe, and so have them hashed on the way to
+# disk. MP4 has to be fragmented there, since the muxer can't seek back to
+# write its index, and loses a cover image (attached_pic) that way; Matroska
+# would lose its duration and seek index. MKV, WebM and MP4s with a cover are
+# written to disk directly and hashed once they are done.
+PIPE_MUXER_ARGS = {
+    '.mp4': ['-f', 'mp4', '-movflags', '+frag_keyframe+empty_moov+default_base_moof'],
+}
+
+
+def update_hash_from_file(hasher, path):
+    """Feed a file to hasher through a read-only memory map. Returns the bytes read."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                # hashlib releases the GIL for large updates, so threads hash in parallel
+                for offset in range(0, size, HASH_CHUNK):
+                    hasher.update(view[offset:offset + HASH_CHUNK])
+            finally:
+                view.release()
+    return size
+
+
+def hash_file(path, algorithm):
+    hasher = HASH_ALGORITHMS[algorithm]()
+    update_hash_from_file(hasher, path)
+    return hasher.hexdigest()
+
+
+def run_ffmpeg_hashed(cmd, out_path, hasher, final=None):
+    """Run ffmpeg with its output on a pipe, writing out_path and hashing it in
+    the same pass. cmd is the command line without the output; the muxer
+    comes from PIPE_MUXER_ARGS. Returns ffmpeg's log."""
+    args = PIPE_MUXER_ARGS[os.path.splitext(out_path)[1].lower()]
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen([*cmd, *args, 'pipe:1'], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=log, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        try:
+            with hasher.wrap(open(out_path, 'wb'), out_path, 'wb', final) as out:
+                shutil.copyfileobj(proc.stdout, out, 1024 * 1024)
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        log.seek(0)
+        output = log.read().decode('utf-8', 'replace')
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=output)
+    return output
+
+
+class HashingStream:
+    """File object that feeds every write to a running hash."""
+
+    def __init__(self, stream, state, on_close):
+        self._stream = stream
+        self._state = state  # [hash object, bytes hashed]
+        self._on_close = on_close
+
+    def write(self, data):
+        written = self._stream.write(data)
+        self._state[0].update(data)
+        self._state[1] += len(data)
+        return written
+
+    def close(self):
+        if self._stream.closed:
+            return
+        self._stream.flush()
+        stat = os.fstat(self._stream.fileno())
+        self._stream.close()
+        self._on_close(stat)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class InlineHasher:
+    """Hashes one job's files while they are being written.
+
+    wrap() puts a HashingStream around a file being written, so every byte is
+    hashed on its way to disk. PooledYoutubeDL wraps the file each of yt-dlp's
+    own downloaders writes (HTTP, HLS and DASH), and JobMergerPP has ffmpeg
+    write a merged MP4 through a pipe into a wrapped file; live recordings are
+    remuxed the same way. None of these files is read back.
+
+    The rest is hashed once it is done, which does read it again: resumed
+    .part files (only the part already on disk), MKV/WebM merges and merges
+    with a cover image (see PIPE_MUXER_ARGS), files another postprocessor
+    rewrites (audio extraction, fixups) and clips, which ffmpeg downloads
+    itself.
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._partial = {}  # file being written -> [hash object, bytes hashed]
+        self._written = {}  # finished file -> (digest, size, inode)
+        self.files = []     # final files, as recorded in the history
+
+    def wrap(self, stream, filename, open_mode, final=None):
+        """Hash what is written to stream, the open file filename. final is the
+        name the file gets when it is done (by default filename without .part)."""
+        with self._lock:
+            state = self._partial.get(filename)
+            if 'a' not in open_mode or state is None or state[1] != os.path.getsize(filename):
+                state = [HASH_ALGORITHMS[self.algorithm](), 0]
+                if 'a' in open_mode:
+                    # Resuming a partial file left by an earlier run: hash what is already there
+                    state[1] = update_hash_from_file(state[0], filename)
+            self._partial[filename] = state
+        if final is None:
+            final = filename[:-len('.part')] if filename.endswith('.part') else filename
+
+        def on_close(stat):
+            with self._lock:
+                if self._partial.get(filename) is state and state[1] == stat.st_size:
+                    self._written[os.path.abspath(final)] = (state[0].hexdigest(), stat.st_size, stat.st_ino)
+        return HashingStream(stream, state, on_close)
+
+    def finalize(self, path):
+        """post_hooks callback: record the hash of a finished, postprocessed file."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            written = self._written.pop(path, None)
+        if written and written[1:] == (stat.st_size, stat.st_ino):
+            digest = written[0]
+        else:
+            digest = hash_file(path, self.algorithm)
+        with self._lock:
+            self.files.append({'path': path, 'size': stat.st_size, 'algorithm': self.algorithm, 'digest': digest})
+
+
+def verify_library(files, on_result=None):
+    """Hash recorded files again, one per core, and compare. Returns {status: [file, ...]}."""
+    def check(file):
+        path = file['path']
+        try:
+            if not os.path.exists(path):
+                return 'missing'
+            if file['algorithm'] not in HASH_ALGORITHMS:
+                return 'skipped'
+            if os.path.getsize(path) != file['size']:
+                return 'changed'
+            return 'ok' if hash_file(path, file['algorithm']) == file['digest'] else 'changed'
+        except OSError:
+            return 'unreadable'
+
+    results = {'ok': [], 'changed': [], 'missing': [], 'unreadable': [], 'skipped': []}
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        for done, (file, status) in enumerate(zip(files, pool.map(check, files)), 1):
+            results[status].append(file)
+            if on_result is not None:
+                on_result(done, file, status)
+    return results
+
+
+# --- Adaptive fragment concurrency (additive increase, multiplicative decrease) ---
+# yt-dlp sizes its fragment thread pool once per download, so each download of
+# a job gets the threads its controller may use next, and a gate in the job's
+# PooledYoutubeDL decides how many of their requests are on the wire at once.
+FRAGMENT_CHOICES = {"Auto": None, "1 at a time": 1, "3 at a time": 3, "8 at a time": 8, "16 at a time": 16}
+FRAGMENTS_START = 3
+FRAGMENTS_MAX = 16
+FRAGMENTS_WINDOW = 1.0   # seconds of throughput per decision
+FRAGMENTS_GAIN = 0.10    # an extra fragment has to add this much throughput to stay
+FRAGMENTS_HOLD = 5       # windows to stay at the knee before probing again
+THROTTLE_STATUSES = (429, 503)
+FRAGMENT_RETRIES = 10    # the yt-dlp API default is to give a failed fragment up at once
+FRAGMENT_RETRY_SLEEP = 0.5
+FRAGMENT_RETRY_SLEEP_MAX = 8.0
+
+
+class FragmentConcurrency:
+    """AIMD controller for the number of fragments a job downloads at once.
+
+    Throughput is measured from the job's progress hook over fixed windows.
+    While another fragment in flight still adds throughput, one more is
+    allowed; when it doesn't, the controller steps back to the best level
+    (the knee) and probes upwards again later. A 429/503 from the server
+    halves the limit and caps later probes below the level that was throttled.
+    Each download gets worker threads for twice the current limit, within
+    that cap, so the job's worker count follows the limit between downloads.
+    """
+
+    def __init__(self, start=FRAGMENTS_START, minimum=1, maximum=FRAGMENTS_MAX, window=FRAGMENTS_WINDOW):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.limit = max(minimum, min(start, maximum))
+        self.ceiling = maximum
+        self.workers = maximum
+        self.decisions = []
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._active = 0
+        self._next_ticket = 0
+        self._admitted = 0
+        self._seen = {}  # file -> downloaded bytes last reported
+        self._window_start = None
+        self._window_bytes = 0
+        self._best = (0.0, self.limit)  # (bytes/s, limit) of the best level so far
+        self._hold = 0
+        self._throttled_at = 0.0
+
+    def acquire(self):
+        """Wait for a request slot; hand it back with release()."""
+        # A downloader thread reads one response at a time, so one it gave up
+        # on (a failed read that is retried) frees its slot here
+        previous = getattr(self._local, 'slot', None)
+        if previous is not None:
+            self.release(previous)
+        # First come, first served: fragments are appended in order, so one
+        # overtaken at the gate would hold back writing everything after it
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._admitted or self._active >= self.limit:
+                self._cond.wait()
+            self._admitted += 1
+            self._active += 1
+            self._cond.notify_all()
+        slot = self._local.slot = {'held': True}
+        return slot
+
+    def release(self, slot):
+        with self._cond:
+            if not slot['held']:
+                return
+            slot['held'] = False
+            self._active -= 1
+            self._cond.notify_all()
+
+    def pool_size(self):
+        """Worker threads for the job's next download."""
+        with self._cond:
+            workers = min(self.ceiling, max(FRAGMENTS_START, 2 * self.limit))
+            if workers != self.workers:
+                self.decisions.append((time.monotonic(), self.workers, workers, "workers", None))
+                self.workers = workers
+            return workers
+
+    def progress_hook(self, d):
+        if d.get('status') != 'downloading' or d.get('fragment_index') is None:
+            return
+        now = time.monotonic()
+        key = d.get('tmpfilename') or d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._cond:
+            self._window_bytes += max(0, downloaded - self._seen.get(key, 0))
+            self._seen[key] = downloaded
+            if self._window_start is None:
+                self._window_start, self._window_bytes = now, 0
+                return
+            elapsed = now - self._window_start
+            if elapsed < self.window:
+                return
+            rate = self._window_bytes / elapsed
+            self._window_start, self._window_bytes = now, 0
+            self._update(rate)
+
+    def throttled(self, reason):
+        with self._cond:
+            now = time.monotonic()
+            # A burst of errors from the same overload counts once
+            if now - self._throttled_at < self.window:
+                return
+            self._throttled_at = now
+            self.ceiling = max(self.minimum, self.limit - 1)
+            new_limit = max(self.minimum, self.limit // 2)
+            self._best = (0.0, new_limit)
+            self._hold = FRAGMENTS_HOLD
+            self._set(new_limit, reason)
+
+    def _update(self, rate):
+        best_rate, best_limit = self._best
+        if self.limit == best_limit:
+            # At the knee (or just started): track its throughput, probe upwards after a while
+            self._best = (rate, self.limit)
+            if self._hold:
+                self._hold -= 1
+            elif self.limit < min(self.ceiling, self.workers):
+                self._set(self.limit + 1, "probe", rate)
+        elif rate > best_rate * (1 + FRAGMENTS_GAIN):
+            # The extra fragment paid off: keep it and try another
+            self._best = (rate, self.limit)
+            if self.limit < min(self.ceiling, self.workers):
+                self._set(self.limit + 1, "faster", rate)
+        else:
+            # No gain: the link (or the server) is saturated one level below
+            self._hold = FRAGMENTS_HOLD
+            self._set(best_limit, "knee", rate)
+
+    def _set(self, limit, reason, rate=None):
+        if limit == self.limit:
+            return
+        self.decisions.append((time.monotonic(), self.limit, limit, reason, rate))
+        self.limit = limit
+        self._window_start = None
+        self._cond.notify_all()
+
+
+def fragment_retry_sleep(n):
+    """Exponential backoff between attempts at a failed fragment."""
+    return min(FRAGMENT_RETRY_SLEEP * 2 ** n, FRAGMENT_RETRY_SLEEP_MAX)
+
+
+class GatedResponse:
+    """A response that holds its request slot until it is read to the end, closed or dropped."""
+
+    def __init__(self, response, controller, slot):
+        self._response = response
+        self._controller = controller
+        self._slot = slot
+
+    def read(self, *args, **kwargs):
+        data = self._response.read(*args, **kwargs)
+        if not data or not (args or kwargs):
+            self._controller.release(self._slot)
+        return data
+
+    def close(self):
+        self._controller.release(self._slot)
+        self._response.close()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self._controller.release(self._slot)
+
+
+# --- Streaming playlist extraction (memory stays flat for large channels) ---
+def resolve_playlist(ydl, url):
+    """Extract a URL without processing its entries, following URL redirects.
+
+    For playlists the 'entries' stay a lazy generator/list of stubs, so no
+    entry's formats are fetched or held until that entry is downloaded.
+    """
+    info = ydl.extract_info(url, download=False, process=False)
+    while info and info.get('_type') in ('url', 'url_transparent'):
+        info = ydl.extract_info(info['url'], download=False, ie_key=info.get('ie_key'), process=False)
+    return info
+
+
+def iter_playlist_entries(playlist, start=None, end=None):
+    """Yield (playlist_index, entry) for the selected range without materializing the list."""
+    for index, entry in enumerate(playlist.get('entries') or [], 1):
+        if start and index < start:
+            continue
+        if end and index > end:
+            break
+        if entry:
+            yield index, entry
+
+
+# --- Media library: each file stored once, linked into every folder that wants it ---
+# Files live under <download folder>/.library/<extractor>/<video id>/<profile>.<ext>;
+# the playlist and video folders hold links to them. Being inside the
+# download folder keeps the store on the same filesystem, which hard links
+# and reflinks need.
+LIBRARY_DIR = ".library"
+LIBRARY_LINK_MODES = {
+    "Off": None,
+    "Hard links": 'hardlink',
+    "Reflinks (copy-on-write)": 'reflink',
+    "Symbolic links": 'symlink',
+}
+LIBRARY_PROFILE_KEYS = ('format', 'quality', 'sidecars')  # job options that change the stored file
+LIBRARY_PARTIAL_SUFFIXES = ('.part', '.ytdl', '.temp', '.link')
+FICLONE = 0x40049409  # Linux ioctl that shares the source file's extents (btrfs, XFS)
+
+
+def library_profile(job):
+    """Name for the variant of a video a job asks for, e.g. 'mp4-video-audio-1080p-3f2a91c0'."""
+    options = {key: job.get(key) for key in LIBRARY_PROFILE_KEYS}
+    digest = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:8]
+    readable = re.sub(r'[^a-z0-9]+', '-', f"{job.get('format')} {job.get('quality')}".lower()).strip('-')
+    return f"{readable}-{digest}"
+
+
+def reflink_file(src, dst):
+    """Copy src to dst sharing its data blocks. Raises OSError where that is not supported."""
+    if sys.platform == 'darwin':
+        # APFS clones
+        if subprocess.run(['cp', '-c', src, dst], capture_output=True).returncode != 0:
+            raise OSError(f"cannot clone {src}")
+        return
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this system")
+    try:
+        with open(src, 'rb') as source, open(dst, 'wb') as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+
+
+def link_file(src, dst, mode):
+    """Make dst refer to src, falling back reflink -> hard link -> symlink -> copy. Returns the kind made."""
+    modes = ('reflink', 'hardlink', 'symlink')
+    for kind in modes[modes.index(mode):]:
+        try:
+            if kind == 'reflink':
+                reflink_file(src, dst)
+            elif kind == 'hardlink':
+                os.link(src, dst)
+            else:
+                # Relative, so the folder and its .library can be moved together
+                os.symlink(os.path.relpath(src, os.path.dirname(dst)), dst)
+            return kind
+        except (OSError, NotImplementedError):
+            continue
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+class MediaLibrary:
+    """Content store keyed by extractor, video ID and format profile.
+
+    lookup() answers from the filesystem alone, so an entry that is already
+    stored costs no network request. ingest() moves a finished download into
+    the store and leaves a link in its place.
+    """
+
+    def __init__(self, folder, link_mode='hardlink', profile=''):
+        self.root = os.path.join(folder, LIBRARY_DIR)
+        self.link_mode = link_mode
+        self.profile = profile
+        self._lock = threading.Lock()
+
+    def _item_dir(self, extractor, video_id):
+        safe = lambda text: re.sub(r'[\\/:*?"<>|]', '_', str(text))
+        return os.path.join(self.root, safe(extractor.lower()), safe(video_id))
+
+    def lookup(self, extractor, video_id):
+        """Path of the stored file for this video, or None."""
+        if not extractor or not video_id:
+            return None
+        item_dir = self._item_dir(extractor, video_id)
+        try:
+            names = os.listdir(item_dir)
+        except OSError:
+            return None
+        for name in names:
+            if name.startswith(self.profile + '.') and not name.endswith(LIBRARY_PARTIAL_SUFFIXES):
+                return os.path.join(item_dir, name)
+        return None
+
+    def link(self, stored, target):
+        """Put a link to a stored file at target (replacing what is there). Returns the kind made."""
+        if os.path.exists(target) and os.path.samefile(stored, target):
+            return 'existing'
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        temp = target + '.link'
+        if os.path.lexists(temp):
+            os.remove(temp)
+        kind = link_file(stored, temp, self.link_mode)
+        os.replace(temp, target)
+        return kind
+
+    def ingest(self, info):
+        """Move the files of a finished download (a processed info dict) into the store."""
+        extractor, video_id = info.get('extractor_key'), info.get('id')
+        if not extractor or not video_id:
+            return
+        for download in info.get('requested_downloads') or []:
+            path = download.get('filepath')
+            if not path or not os.path.isfile(path) or os.path.islink(path):
+                continue
+            with self._lock:
+                stored = self.lookup(extractor, video_id)
+                if stored is None:
+                    item_dir = self._item_dir(extractor, video_id)
+                    os.makedirs(item_dir, exist_ok=True)
+                    stored = os.path.join(item_dir, self.profile + os.path.splitext(path)[1])
+                    os.replace(path, stored)
+                # A copy that was downloaded meanwhile is replaced by a link as well
+                self.link(stored, path)
+
+    def link_entry(self, ydl, entry, extra_info=None):
+        """Link an entry that is already stored into place without extracting it. Returns the path or None."""
+        stored = self.lookup(entry.get('ie_key') or entry.get('extractor_key'), entry.get('id'))
+        if stored is None:
+            return None
+        ext = os.path.splitext(stored)[1][1:]
+        target = ydl.prepare_filename({**entry, **(extra_info or {}), 'ext': ext})
+        self.link(stored, target)
+        return target
+
+
+def download_playlist_streaming(job, playlist, ydl_opts, start=None, end=None, retries=3, library=None):
+    """Download a resolved playlist one entry at a time; each entry's info is dropped when it is done.
+
+    An entry that still fails after its retries is reported and skipped.
+    Entry boundaries are also where the scheduler may park this job.
+    Returns the number of entries that failed.
+    """
+    with ydl_pool.session(ydl_opts) as ydl:
+        if playlist.get('_type') not in ('playlist', 'multi_video'):
+            downloaded = ydl.process_ie_result(copy.deepcopy(playlist), download=True)
+            if library is not None:
+                library.ingest(downloaded)
+            return 0
+        extra_info = {
+            'playlist': playlist.get('title') or playlist.get('id'),
+            'playlist_id': playlist.get('id'),
+            'playlist_title': playlist.get('title'),
+            'playlist_uploader': playlist.get('uploader'),
+        }
+        failed = 0
+        for index, entry in iter_playlist_entries(playlist, start, end):
+            scheduler.entry_boundary(job)
+            if job['cancel'].is_set():
+                raise Exception("Download cancelled by user")
+            entry_info = {**extra_info, 'playlist_index': index}
+            title = entry.get('title') or entry.get('id')
+            # Already in the library: link it, nothing to fetch
+            if library is not None and library.link_entry(ydl, entry, entry_info):
+                job_ui(job, lambda: status_icon_label.config(text="⛓", fg=COLORS["status_info"]))
+                job_ui(job, lambda: status_label.config(text=f"Linked from library: {title}", fg=COLORS["status_info"]))
+                continue
+            attempts_left = retries
+            while True:
+                try:
+                    # The returned info dict (formats, thumbnails, ...) is not kept
+                    downloaded = ydl.process_ie_result(dict(entry), download=True, extra_info=entry_info)
+                    if library is not None:
+                        library.ingest(downloaded)
+                    break
+                except Exception as e:
+                    if job['cancel'].is_set():
+                        raise
+                    # The session is bound to this job's path; other jobs avoid it if it is blocked
+                    network_paths.report_error(job, e, reassign=False)
+                    attempts_left -= 1
+                    if attempts_left <= 0:
+                        event_bus.publish('error', f"Skipped playlist entry {index}: {title}", e, job)
+                        failed += 1
+                        break
+                    event_bus.publish('warning', f"Retrying playlist entry {index}: {title}", e, job)
+                    job_ui(job, lambda: status_icon_label.config(text="!", fg=COLORS["status_warn"]))
+                    job_ui(job, lambda: status_label.config(text=f"Retrying... ({attempts_left} attempts left)", fg=COLORS["status_warn"]))
+        return failed
+
+
+# --- Clips: download only the requested time ranges ---
+CLIP_PLACEHOLDER = "Clip is optional, e.g. 1:02:00-1:04:30"
+
+
+def parse_timestamp(text):
+    """'90', '1:30' or '1:01:30.5' -> seconds."""
+    parts = text.strip().split(':')
+    if len(parts) > 3 or not all(re.fullmatch(r'\d+(?:\.\d+)?', part) for part in parts):
+        raise ValueError(f"'{text.strip()}' is not a time")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_clip_ranges(text):
+    """'1:00-2:00, 10:00-' -> [(60.0, 120.0), (600.0, inf)], sorted, overlaps merged."""
+    ranges = []
+    for chunk in re.split(r'[,;]', text):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        start, separator, end = chunk.partition('-')
+        if not separator:
+            raise ValueError(f"'{chunk}' is not a start-end range")
+        start = parse_timestamp(start) if start.strip() else 0.0
+        end = parse_timestamp(end) if end.strip() else float('inf')
+        if end <= start:
+            raise ValueError(f"'{chunk}' ends before it starts")
+        ranges.append((start, end))
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def clip_duration(ranges, duration):
+    """Seconds covered by the ranges, for a video of the given duration."""
+    return sum(max(0.0, min(end, duration) - start) for start, end in ranges)
+
+
+# --- Live stream and premiere recording (bounded buffers, split output) ---
+LIVE_MODES = {
+    "Record from now": None,
+    "Keep last 10 min": 10 * 60,
+    "Keep last 30 min": 30 * 60,
+    "Keep last 60 min": 60 * 60,
+}
+LIVE_SPLITS = {
+    "Don't split": None,
+    "New file every 30 min": ('time', 30 * 60),
+    "New file every hour": ('time', 60 * 60),
+    "New file every 1 GB": ('size', 1024 ** 3),
+    "New file every 4 GB": ('size', 4 * 1024 ** 3),
+}
+LIVE_QUEUE_SEGMENTS = 16  # segments held in memory between fetching and writing
+LIVE_MAX_FAILURES = 10    # playlist fetches in a row that may fail before the stream counts as ended
+LIVE_SEGMENT_RETRY_SLEEP = 0.5  # seconds before a segment's 2nd attempt, twice that before its 3rd
+LIVE_WAIT_POLL = 30       # seconds between checks while waiting for a premiere to start
+
+
+def parse_live_playlist(text, base_url):
+    """Parse an HLS media playlist into its segments, init segment and end flag."""
+    playlist = {'sequence': 0, 'target': 6.0, 'segments': [], 'init_url': None, 'ended': False}
+    duration = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist['sequence'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist['target'] = float(line.split(':', 1)[1])
+        elif line.startswith('#EXTINF:'):
+            duration = float(line[len('#EXTINF:'):].split(',')[0])
+        elif line.startswith('#EXT-X-MAP:'):
+            match = re.search(r'URI="([^"]+)"', line)
+            playlist['init_url'] = match and urljoin(base_url, match.group(1))
+        elif line.startswith('#EXT-X-KEY:') and 'METHOD=NONE' not in line:
+            raise ValueError("Encrypted live streams are not supported.")
+        elif line.startswith('#EXT-X-STREAM-INF:'):
+            raise ValueError("Expected a media playlist, got a master playlist.")
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist['ended'] = True
+        elif line and not line.startswith('#'):
+            sequence = playlist['sequence'] + len(playlist['segments'])
+            playlist['segments'].append((sequence, duration or playlist['target'], urljoin(base_url, line)))
+            duration = None
+    return playlist
+
+
+def remux_live_part(path, ffmpeg, on_warning, hasher=None):
+    """Stream-copy a recorded part into MP4 (hashed as it is written, given a
+    hasher). Keeps the raw part if that fails."""
+    target = os.path.splitext(path)[0] + '.mp4'
+    cmd = [ffmpeg, '-y', '-loglevel', 'error', '-i', path, '-map', '0', '-c', 'copy']
+    try:
+        if hasher is not None:
+            run_ffmpeg_hashed(cmd, target, hasher)
+        else:
+            subprocess.run([*cmd, '-movflags', '+faststart', target], check=True, capture_output=True,
+                           creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    except (OSError, subprocess.CalledProcessError) as e:
+        on_warning(f"Couldn't convert {os.path.basename(path)} to MP4, kept the raw recording: {e}")
+        return path
+    os.remove(path)
+    return target
+
+
+class LiveRecorder:
+    """Records a live HLS stream: fetch -> bounded queue -> writer -> remux.
+
+    The fetcher (the calling thread) polls the media playlist and downloads
+    new segments into a bounded queue, the memory buffer. A writer thread
+    appends them to the current part file or, when only the last N minutes
+    are kept, to a ring of segment files on disk that is trimmed as it grows.
+    Finished parts are remuxed in the background while the next part is
+    recorded, so neither the fetcher nor the writer waits on ffmpeg.
+
+    fmt must be a single muxed HLS format. All requests go through ydl, so
+    the job's cookies, proxy and source address apply to every segment.
+    """
+
+    def __init__(self, ydl, fmt, output_base, keep_seconds=None, split=None, hasher=None,
+                 should_stop=None, on_status=None, on_warning=None, ffmpeg='ffmpeg'):
+        if fmt.get('requested_formats') or not fmt.get('url'):
+            raise ValueError("LiveRecorder needs a single HLS format with its own URL")
+        self.ydl = ydl
+        self.fmt = fmt
+        self.output_base = output_base
+        self.keep_seconds = keep_seconds
+        self.split = split
+        self.hasher = hasher
+        self.should_stop = should_stop or (lambda: False)
+        self.on_status = on_status
+        self.on_warning = on_warning or (lambda message: None)
+        self.ffmpeg = ffmpeg
+        self.error = None
+        self.recorded_seconds = 0.0
+        self.recorded_bytes = 0
+        self._queue = queue.Queue(maxsize=LIVE_QUEUE_SEGMENTS)
+        self._init = None
+        self._part = None
+        self._part_path = None
+        self.part_number = 0
+        self._part_bytes = 0
+        self._part_seconds = 0.0
+        self._ring = deque()  # (path, duration) of the segments kept on disk
+        self._ring_seconds = 0.0
+        self._spool_dir = output_base + ".live-buffer"
+        self._remux = ThreadPoolExecutor(max_workers=1, thread_name_prefix='live-remux')
+        self._remuxed = []
+        self._last_status = 0.0
+
+    def record(self):
+        """Record until the stream ends or should_stop() is true. Returns the finished files."""
+        writer = threading.Thread(target=self._write_loop, name='live-writer', daemon=True)
+        writer.start()
+        try:
+            self._fetch_loop()
+        finally:
+            self._put(None, force=True)
+            writer.join()
+            self._remux.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error
+        files = [future.result() for future in self._remuxed]
+        if self.hasher is not None:
+            for path in files:
+                self.hasher.finalize(path)
+        return files
+
+    # Fetching
+    def _get(self, url):
+        headers = self.fmt.get('http_headers') or {}
+        with self.ydl.urlopen(Request(url, headers=headers)) as response:
+            return response.read()
+
+    def _sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self.should_stop() and self.error is None:
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+
+    def _put(self, item, force=False):
+        # Blocks while the writer is behind, which is what bounds memory
+        while True:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if self.error is not None and not force:
+                    return
+
+    def _fetch_loop(self):
+        url = self.fmt['url']
+        next_sequence = None
+        failures = 0
+        while not self.should_stop() and self.error is None:
+            try:
+                playlist = parse_live_playlist(self._get(url).decode('utf-8', 'replace'), url)
+                if playlist['init_url'] and self._init is None:
+                    self._init = self._get(playlist['init_url'])
+                failures = 0
+            except ValueError:
+                raise
+            except Exception as e:
+                failures += 1
+                if failures >= LIVE_MAX_FAILURES:
+                    self.on_warning(f"The live stream stopped responding, recording ended: {e}")
+                    return
+                self._sleep(2)
+                continue
+            segments = playlist['segments']
+            if next_sequence is None and self.keep_seconds is None:
+                # "Record from now" starts at the live edge
+                segments = segments[-1:]
+            for sequence, duration, segment_url in segments:
+                if next_sequence is not None and sequence < next_sequence:
+                    continue
+                if next_sequence is not None and sequence > next_sequence:
+                    self.on_warning(f"{sequence - next_sequence} segments left the playlist before they were fetched")
+                data = None
+                for attempt in range(3):
+                    try:
+                        data = self._get(segment_url)
+                        break
+                    except Exception as e:
+                        if attempt == 2:
+                            self.on_warning(f"Segment {sequence} skipped after 3 attempts: {e}")
+                        else:
+                            self._sleep(LIVE_SEGMENT_RETRY_SLEEP * (attempt + 1))
+                next_sequence = sequence + 1
+                if data is not None:
+                    self._put((sequence, duration, data))
+                if self.should_stop() or self.error is not None:
+                    return
+            if playlist['ended']:
+                return
+            # New segments appear about once per target duration
+            self._sleep(max(0.5, playlist['target'] / 2))
+
+    # Writing
+    def _write_loop(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                sequence, duration, data = item
+                if self.keep_seconds:
+                    self._ring_append(sequence, duration, data)
+                else:
+                    self._part_append(duration, data)
+                self.recorded_seconds += duration
+                self.recorded_bytes += len(data)
+                self._report()
+            if self.keep_seconds:
+                self._flush_ring()
+            self._close_part()
+        except Exception as e:
+            self.error = e
+            # Drain so the fetcher is never left blocked on a full queue
+            while self._queue.get() is not None:
+                pass
+
+    def _report(self):
+        now = time.monotonic()
+        if self.on_status is not None and now - self._last_status >= 1:
+            self._last_status = now
+            self.on_status(self)
+
+    def _part_append(self, duration, data):
+        if self._part is not None and self.split:
+            kind, limit = self.split
+            if (self._part_seconds if kind == 'time' else self._part_bytes) + (
+                    duration if kind == 'time' else len(data)) > limit:
+                self._close_part()
+        if self._part is None:
+            self._open_part()
+        self._part.write(data)
+        self._part_bytes += len(data)
+        self._part_seconds += duration
+
+    def _open_part(self):
+        self.part_number += 1
+        ext = '.m4s' if self._init else '.ts'
+        suffix = f" (part {self.part_number:03d})" if self.split else ""
+        self._part_path = path = f"{self.output_base}{suffix}{ext}"
+        self._part = open(path, 'wb')
+        if self.hasher is not None:
+            # Used if the remux fails and the raw part is kept
+            self._part = self.hasher.wrap(self._part, path, 'wb')
+        if self._init:
+            self._part.write(self._init)
+        self._part_bytes = self._part_seconds = 0
+
+    def _close_part(self):
+        if self._part is None:
+            return
+        self._part.close()
+        self._part = None
+        self._remuxed.append(self._remux.submit(remux_live_part, self._part_path, self.ffmpeg,
+                                                self.on_warning, self.hasher))
+
+    def _ring_append(self, sequence, duration, data):
+        os.makedirs(self._spool_dir, exist_ok=True)
+        path = os.path.join(self._spool_dir, f"{sequence}.seg")
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._ring.append((path, duration))
+        self._ring_seconds += duration
+        while self._ring and self._ring_seconds - self._ring[0][1] >= self.keep_seconds:
+            old_path, old_duration = self._ring.popleft()
+            os.remove(old_path)
+            self._ring_seconds -= old_duration
+
+    def _flush_ring(self):
+        while self._ring:
+            path, duration = self._ring.popleft()
+            with open(path, 'rb') as f:
+                self._part_append(duration, f.read())
+            os.remove(path)
+        self._ring_seconds = 0.0
+        if os.path.isdir(self._spool_dir):
+            os.rmdir(self._spool_dir)
+
+
+def is_live_info(info):
+    return info.get('live_status') in ('is_live', 'is_upcoming') or bool(info.get('is_live'))
+
+
+def record_live_stream(job, url, info, output_base, max_height, hasher=None):
+    """Wait for an upcoming stream or premiere, then record it with LiveRecorder."""
+    def should_stop():
+        return job['cancel'].is_set()
+
+    def show_status(text):
+        job_ui(job, lambda: status_icon_label.config(text="⏺", fg=COLORS["status_info"]))
+        job_ui(job, lambda: status_label.config(text=text, fg=COLORS["status_info"]))
+
+    live_opts = {
+        'logger': MyLogger(job),
+        # "best" only matches formats carrying both video and audio, so this
+        # never turns into a merge of separate streams
+        'format': f'best[protocol^=m3u8][height<={max_height}]/best[protocol^=m3u8]',
+        'ignore_no_formats_error': True,
+        **network_path_opts(job),
+    }
+    with ydl_pool.session(live_opts) as ydl:
+        while info.get('live_status') == 'is_upcoming' and not should_stop():
+            starts = info.get('release_timestamp')
+            wait = LIVE_WAIT_POLL
+            if starts:
+                show_status(f"Waiting for the stream to start ({datetime.fromtimestamp(starts):%H:%M})...")
+                wait = max(LIVE_WAIT_POLL, min(starts - time.time(), 10 * LIVE_WAIT_POLL))
+            else:
+                show_status("Waiting for the stream to start...")
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline and not should_stop():
+                time.sleep(0.5)
+            if not should_stop():
+                info = resolve_playlist(ydl, url)
+        if should_stop():
+            return []
+        fmt = ydl.process_ie_result(copy.deepcopy(info), download=False)
+        if fmt.get('requested_formats') or not str(fmt.get('protocol', '')).startswith('m3u8'):
+            raise ValueError("This live stream has no single HLS format, so it can't be recorded.")
+
+        def on_status(recorder):
+            elapsed = int(recorder.recorded_seconds)
+            text = (f"Recording {elapsed // 3600}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d} · "
+                    f"{format_size(recorder.recorded_bytes)}")
+            if recorder.keep_seconds:
+                text += f" · keeping last {recorder.keep_seconds // 60} min"
+            elif recorder.split:
+                text += f" · part {recorder.part_number}"
+            buffered = recorder._queue.qsize()
+            show_status(text)
+            job_ui(job, lambda: progress_label.config(text="LIVE"))
+            job_ui(job, lambda: speed_label.config(text=f"Buffer: {buffered}/{LIVE_QUEUE_SEGMENTS} segments"))
+
+        ffmpeg = extract_ffmpeg()
+        recorder = LiveRecorder(ydl, fmt, output_base,
+                                keep_seconds=LIVE_MODES.get(job.get('live_mode')),
+                                split=LIVE_SPLITS.get(job.get('live_split')),
+                                hasher=hasher, should_stop=should_stop, on_status=on_status,
+                                on_warning=lambda message: event_bus.publish('warning', "Live recording", message, job),
+                                ffmpeg=ffmpeg if os.path.exists(ffmpeg) else 'ffmpeg')
+        show_status("Recording...")
+        return recorder.record()
+
+
+# --- Speculative metadata prefetch (starts when a URL is pasted) ---
+# Format URLs expire, so an old prefetch is extracted again at download time
+PREFETCH_MAX_AGE = 20 * 60
+PREFETCH_WAIT = 30
+prefetch_lock = threading.Lock()
+prefetch_state = {"key": None, "generation": 0, "done": None, "cancel": None, "info": None, "time": 0}
+
+
+def format_size(bytes):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes < 1024:
+            return f"{bytes:.1f} {unit}"
+        bytes /= 1024
+    return f"{bytes:.1f} GB"
+
+
+def start_metadata_prefetch(*_):
+    """Extract the URL's metadata in the background so Download can start at once.
+
+    A newer URL supersedes the running prefetch: the old one is cancelled at
+    its next request (a request already in flight still completes) and
+    whatever it got is discarded.
+    """
+    url = url_entry.get().strip()
+    if url == "Video URL" or not is_valid_youtube_url(url):
+        return
+    key = (url, playlist_var.get())
+    with prefetch_lock:
+        if prefetch_state["key"] == key and (
+                not prefetch_state["done"].is_set() or time.time() - prefetch_state["time"] < PREFETCH_MAX_AGE):
+            return
+        if prefetch_state["cancel"] is not None:
+            prefetch_state["cancel"].set()
+        prefetch_state["generation"] += 1
+        prefetch_state.update(key=key, done=threading.Event(), cancel=threading.Event(), info=None, time=time.time())
+        generation, done, cancel = prefetch_state["generation"], prefetch_state["done"], prefetch_state["cancel"]
+    prefetch_label.config(text="Looking up video...")
+    threading.Thread(target=prefetch_task, args=(key, generation, done, cancel), daemon=True).start()
+
+
+def prefetch_task(key, generation, done, cancel):
+    url, is_playlist = key
+    info = error = None
+    try:
+        opts = {'noplaylist': not is_playlist, 'quiet': True, 'no_warnings': True, 'cancel_event': cancel}
+        with ydl_pool.session(opts) as ydl:
+            info = resolve_playlist(ydl, url)
+    except Exception as e:
+        error = e
+    with prefetch_lock:
+        current = prefetch_state["generation"] == generation
+        if current:
+            prefetch_state.update(info=info, time=time.time())
+    done.set()
+    if error is not None and current:
+        # Download extracts again and reports the failure against its job
+        event_bus.publish('warning', "Video lookup failed", error)
+    if current:
+        root.after(0, update_prefetch_label)
+
+
+def take_prefetched_info(url, is_playlist, timeout=PREFETCH_WAIT):
+    """Return the prefetched info for this URL, waiting for a prefetch still in flight."""
+    with prefetch_lock:
+        if prefetch_state["key"] != (url, is_playlist):
+            return None
+        done = prefetch_state["done"]
+    done.wait(timeout)
+    with prefetch_lock:
+        if prefetch_state["key"] != (url, is_playlist) or time.time() - prefetch_state["time"] > PREFETCH_MAX_AGE:
+            return None
+        return prefetch_state["info"]
+
+
+def estimate_download_size(info, format_choice, max_height):
+    formats = info.get('formats') or []
+    if format_choice == "MP3 (Audio Only)":
+        audios = [f for f in formats if f.get('acodec') not in (None, 'none') and f.get('vcodec') == 'none']
+        chosen = max(audios, key=lambda f: f.get('abr') or 0) if audios else None
+    else:
+        chosen = next(make_stream_copy_selector(max_height)({'formats': formats}), None)
+    if not chosen:
+        return None
+    sizes = [f.get('filesize') or f.get('filesize_approx') for f in chosen.get('requested_formats') or [chosen]]
+    return sum(sizes) if all(sizes) else None
+
+
+def update_prefetch_label(*_):
+    """Show title, available qualities and estimated size of the prefetched URL."""
+    with prefetch_lock:
+        info = prefetch_state["info"]
+        current = prefetch_state["key"] == (url_entry.get().strip(), playlist_var.get())
+    if not current or not info:
+        prefetch_label.config(text="")
+        quality_menu.config(values=list(QUALITY_MAP))
+        return
+    title = info.get('title') or 'Unknown Title'
+    if len(title) > 45:
+        title = title[:42] + "..."
+    if info.get('_type') in ('playlist', 'multi_video'):
+        prefetch_label.config(text=f"Playlist: {title}")
+        return
+    heights = {f.get('height') for f in info.get('formats') or [] if f.get('height')}
+    text = title
+    if heights:
+        # Only offer qualities the video actually has (or can be capped to)
+        quality_menu.config(values=[q for q, h in QUALITY_MAP.items() if h <= max(heights)] or list(QUALITY_MAP))
+        text += f"  ·  up to {max(heights)}p"
+    size = estimate_download_size(info, format_var.get(), QUALITY_MAP.get(quality_var.get(), 1080))
+    clip = clip_entry.get().strip()
+    if size and clip and clip != CLIP_PLACEHOLDER and info.get('duration'):
+        # Only the clip's share of the video is fetched
+        try:
+            size = size * clip_duration(parse_clip_ranges(clip), info['duration']) / info['duration']
+            text += "  ·  clip"
+        except ValueError:
+            pass
+    if size:
+        text += f"  ·  ~{format_size(size)}"
+    prefetch_label.config(text=text)
+
+
+def build_job():
+    """Read the form into a job dict. Returns None if the input is invalid."""
     url = url_entry.get().strip()
     if url == "Video URL" or not url:
         messagebox.showwarning("Input Error", "Please enter a Video URL.")
-        download_in_progress = False
-        return
+        return None
     if not is_valid_youtube_url(url):
         messagebox.showwarning("Invalid URL", "Please enter a valid Video URL.")
-        download_in_progress = False
-        return
+        return None
     folder = download_path.get().strip()
-    format_choice = format_var.get()
-    quality_choice = quality_var.get()
-    custom_name = filename_entry.get().strip()
-    is_playlist = playlist_var.get()
-    playlist_start = playlist_start_var.get().strip()
-    playlist_end = playlist_end_var.get().strip()
     if not folder:
         messagebox.showwarning("Input Error", "Please select a download folder.")
-        download_in_progress = False
-        return
+        return None
+    clip = clip_entry.get().strip()
+    if clip == CLIP_PLACEHOLDER:
+        clip = ""
+    try:
+        parse_clip_ranges(clip)
+    except ValueError as e:
+        messagebox.showwarning("Invalid Clip", f"{e}.\n\nUse start-end, e.g. 1:02:00-1:04:30, and separate several ranges with commas.")
+        return None
+    if format_var.get() == "MP4 (Facebook Video)" and 'facebook.com' not in url:
+        messagebox.showwarning("Format Error", "'MP4 (Facebook Video)' is only available for Facebook video links.")
+        return None
+    is_playlist = playlist_var.get()
+    return {
+        'url': url,
+        'folder': folder,
+        'format': format_var.get(),
+        'quality': quality_var.get(),
+        'custom_name': filename_entry.get().strip(),
+        'clip': clip,
+        'exact_cuts': exact_cuts_var.get(),
+        'is_playlist': is_playlist,
+        'playlist_start': playlist_start_var.get().strip(),
+        'playlist_end': playlist_end_var.get().strip(),
+        'sidecars': sidecars_var.get(),
+        'hash': HASH_CHOICES.get(hash_var.get()),
+        'live_mode': live_mode_var.get(),
+        'live_split': live_split_var.get(),
+        'fragments': fragments_var.get(),
+        'library': library_var.get(),
+        'priority': PRIORITY_BULK if is_playlist else PRIORITY_INTERACTIVE,
+    }
+
+
+def download_task(job):
+    job['progress_max'] = 0  # the bar only moves forward
+    url = job['url']
+    folder = job['folder']
+    format_choice = job['format']
+    quality_choice = job['quality']
+    custom_name = job['custom_name']
+    is_playlist = job['is_playlist']
+    playlist_start = job['playlist_start']
+    playlist_end = job['playlist_end']
     # Switch unified button to Cancel after a short delay (e.g., 1.2s)
-    root.after(0, lambda: set_unified_btn_mode("cancel", delay=1200))
+    job_ui(job, lambda: set_unified_btn_mode("cancel", delay=1200))
 
     # Get the height value from quality choice
-    quality_map = {
-        "2160p (4K)": 2160,
-        "1440p (2K)": 1440,
-        "1080p": 1080,
-        "720p": 720,
-        "480p": 480,
-        "360p": 360
-    }
-    max_height = quality_map.get(quality_choice, 1080)
+    max_height = QUALITY_MAP.get(quality_choice, 1080)
 
     # Use the same playlist options for info extraction and download
     info_opts = {}
@@ -385,25 +2985,48 @@ def download_task():
         info_opts['noplaylist'] = False
     else:
         info_opts['noplaylist'] = True
+        # Upcoming streams and premieres have no formats yet; they are waited for below
+        info_opts['ignore_no_formats_error'] = True
 
     # Extract info to get playlist title if needed
     playlist_folder = None
     video_title = None
     try:
-        with yt_dlp.YoutubeDL(info_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            # For playlist, use the playlist title; for single video, use video title
-            if is_playlist and 'title' in info:
-                video_title = info['title']
-                playlist_folder = info['title']
-            elif 'title' in info:
-                video_title = info['title']
-            else:
-                video_title = 'Unknown Title'
+        # Reuse the metadata prefetched when the URL was pasted, if there is one.
+        # Format URLs can be tied to the address that extracted them, so a job
+        # on another network path extracts again. A playlist is always resolved
+        # here: its lazy entries fetch their pages through the session that
+        # resolved them, which stays leased to this job until the job ends.
+        use_prefetch = not network_path_opts(job) and not is_playlist
+        info = take_prefetched_info(url, is_playlist) if use_prefetch else None
+        attempts_left = len(network_paths.paths)  # each path gets about one try
+        while info is None:
+            attempts_left -= 1
+            try:
+                with ExitStack() as attempt:
+                    ydl = attempt.enter_context(ydl_pool.session({**info_opts, **network_path_opts(job)}))
+                    # Entries and format selection are left for the download step
+                    info = resolve_playlist(ydl, url)
+                    if info is None:
+                        raise ValueError("No video was found at this URL.")
+                    if is_playlist:
+                        job['sessions'].enter_context(attempt.pop_all())
+            except Exception as e:
+                # Blocked on this path: try the next one
+                if attempts_left <= 0 or not network_paths.report_error(job, e):
+                    raise
+        # For playlist, use the playlist title; for single video, use video title
+        if is_playlist and 'title' in info:
+            video_title = info['title']
+            playlist_folder = info['title']
+        elif 'title' in info:
+            video_title = info['title']
+        else:
+            video_title = 'Unknown Title'
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to extract info: {e}")
-        download_in_progress = False
+        report_job_failure(job, "Failed to extract info", e)
         return
+    job['title'] = video_title
 
     # If playlist, append playlist folder to download path
     final_folder = folder
@@ -415,8 +3038,7 @@ def download_task():
             try:
                 os.makedirs(final_folder, exist_ok=True)
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to create playlist folder: {e}")
-                download_in_progress = False
+                report_job_failure(job, "Failed to create playlist folder", e)
                 return
 
     # Handle filename (make truly optional for playlist)
@@ -431,6 +3053,42 @@ def download_task():
         else:
             output_template = '%(title)s.%(ext)s'
 
+    # Live streams and premieres are recorded rather than downloaded
+    if not is_playlist and is_live_info(info):
+        if custom_name and custom_name != "Filename is optional":
+            live_name = custom_name
+        else:
+            live_name = re.sub(r'[\\/:*?"<>|]', '_', video_title) + datetime.now().strftime(" %Y-%m-%d %H-%M")
+        hasher = InlineHasher(job['hash']) if job.get('hash') in HASH_ALGORITHMS else None
+        files = record_live_stream(job, url, info, os.path.join(final_folder, live_name), max_height, hasher)
+        if files:
+            save_to_history(url, video_title, format_choice, quality_choice,
+                            {key: job.get(key) for key in HISTORY_OPTION_KEYS},
+                            hasher.files if hasher is not None else None)
+        count = len(files)
+        job_ui(job, lambda: status_icon_label.config(text="✓", fg=COLORS["status_success"]))
+        job_ui(job, lambda: status_label.config(
+            text=f"Recording saved ({count} file{'s' if count != 1 else ''})" if count else "Recording stopped",
+            fg=COLORS["status_success"]))
+        others_running = scheduler.has_other_work()
+        def reset_after_recording():
+            if others_running:
+                return
+            progress_bar.configure(value=0)
+            progress_label.config(text="")
+            speed_label.config(text="")
+            set_unified_btn_mode("download")
+            unified_btn.config(state="normal")
+        job_ui(job, reset_after_recording)
+        return
+
+    # Each clip range becomes its own file, named after its start and end
+    # (an open end has no section_end when the duration is unknown)
+    clip_ranges = parse_clip_ranges(job.get('clip') or "")
+    if clip_ranges:
+        output_template = (output_template[:-len('.%(ext)s')] +
+                           ' [%(section_start>%H-%M-%S)s-%(section_end>%H-%M-%S|end)s].%(ext)s')
+
     # Handle duplicate files differently for playlist and single videos
     output_template = os.path.join(final_folder, output_template)
     if not is_playlist:
@@ -444,13 +3102,19 @@ def download_task():
     # Optimize yt-dlp options for faster downloads
     ydl_opts = {
         'outtmpl': output_template,
-        'logger': MyLogger(),
-        'progress_hooks': [progress_hook],
-        'concurrent_fragment_downloads': 3,  # Download multiple fragments simultaneously
+        'logger': MyLogger(job),
+        'progress_hooks': [lambda d: progress_hook(d, job)],
+        'concurrent_fragment_downloads': FRAGMENTS_START,  # Download multiple fragments simultaneously
+        'fragment_retries': FRAGMENT_RETRIES,
+        # A 5xx is retried by the HTTP downloader itself, fragments included
+        'retries': FRAGMENT_RETRIES,
+        'retry_sleep_functions': {'fragment': fragment_retry_sleep, 'http': fragment_retry_sleep},
         'buffersize': 1024 * 16,  # Increase buffer size for faster downloads
         'http_chunk_size': 10485760,  # Increase chunk size to 10MB
-        'ffmpeg_location': extract_ffmpeg()
+        'ffmpeg_location': extract_ffmpeg(),
+        'postprocessor_hooks': [make_merge_stats_hook(job)]
     }
+    ydl_opts.update(network_path_opts(job))
 
     # Add playlist options if enabled
     if is_playlist:
@@ -464,9 +3128,9 @@ def download_task():
 
     # Add format options
     if format_choice == "MP4 (Video + Audio)":
+        # MP4 when the streams can be copied into it, MKV otherwise (chosen per video)
         ydl_opts.update({
-            'format': f'bestvideo[height<={max_height}]+bestaudio/best[height<={max_height}]',
-            'merge_output_format': 'mp4'
+            'format': make_stream_copy_selector(max_height)
         })
     elif format_choice == "MP4 (Video Only)":
         ydl_opts.update({
@@ -477,12 +3141,10 @@ def download_task():
         # Only allow for Facebook links
         if 'facebook.com' in url:
             ydl_opts.update({
-                'format': 'bestvideo+bestaudio/best',
-                'merge_output_format': 'mp4'
+                'format': make_stream_copy_selector()
             })
         else:
-            messagebox.showwarning("Format Error", "'MP4 (Facebook Video)' is only available for Facebook video links.")
-            download_in_progress = False
+            report_job_failure(job, "Format Error", "'MP4 (Facebook Video)' is only available for Facebook video links.")
             return
     else:  # MP3 (Audio Only)
         ydl_opts.update({
@@ -498,11 +3160,11 @@ def download_task():
 
 
     # Show progress bar and 0% as soon as yt-dlp starts extracting info
-    root.after(0, lambda: status_icon_label.config(text="ℹ️", fg=COLORS["status_info"]))
-    root.after(0, lambda: status_label.config(text="Preparing download...", fg=COLORS["status_info"]))
-    root.after(0, lambda: progress_bar.grid())
-    root.after(0, lambda: progress_bar.configure(value=0))
-    root.after(0, lambda: progress_label.config(text="0%"))
+    job_ui(job, lambda: status_icon_label.config(text="ℹ️", fg=COLORS["status_info"]))
+    job_ui(job, lambda: status_label.config(text="Preparing download...", fg=COLORS["status_info"]))
+    job_ui(job, lambda: progress_bar.grid())
+    job_ui(job, lambda: progress_bar.configure(value=0))
+    job_ui(job, lambda: progress_label.config(text="0%"))
 
     # Hide the collecting label as soon as progress bar shows 0%
     def hide_collecting_label():
@@ -527,7 +3189,7 @@ def download_task():
 
     def playlist_progress_hook(d):
         nonlocal total_playlist_bytes, downloaded_playlist_bytes
-        if cancel_download:
+        if job['cancel'].is_set():
             raise Exception("Download cancelled by user")
 
         # For each video, accumulate total bytes
@@ -550,66 +3212,141 @@ def download_task():
 
             percent = int((downloaded_playlist_bytes[0] / total_playlist_bytes[0]) * 100) if total_playlist_bytes[0] else 0
 
-            def format_size(bytes):
-                for unit in ['B', 'KB', 'MB', 'GB']:
-                    if bytes < 1024:
-                        return f"{bytes:.1f} {unit}"
-                    bytes /= 1024
-                return f"{bytes:.1f} GB"
-
             downloaded_str = format_size(downloaded_playlist_bytes[0])
             total_str = format_size(total_playlist_bytes[0])
             speed = d.get('speed', 0)
             speed_str = format_size(speed) + "/s" if speed else "N/A"
             status_text = f"{downloaded_str} of {total_str} ({speed_str})"
-            root.after(0, lambda: progress_bar.configure(value=percent))
-            root.after(0, lambda: progress_label.config(text=f"{percent}%"))
-            root.after(0, lambda: speed_label.config(text=f"Speed: {speed_str}"))
-            root.after(0, lambda: status_icon_label.config(text="⬇️", fg=COLORS["status_info"]))
-            root.after(0, lambda: status_label.config(text=status_text, fg=COLORS["status_info"]))
+            job_ui(job, lambda: progress_bar.configure(value=percent))
+            job_ui(job, lambda: progress_label.config(text=f"{percent}%"))
+            job_ui(job, lambda: speed_label.config(text=f"Speed: {speed_str}"))
+            job_ui(job, lambda: status_icon_label.config(text="⬇️", fg=COLORS["status_info"]))
+            job_ui(job, lambda: status_label.config(text=status_text, fg=COLORS["status_info"]))
         elif d.get('status') == 'finished':
-            root.after(0, lambda: progress_bar.configure(value=100))
-            root.after(0, lambda: progress_label.config(text="100%"))
-            root.after(0, lambda: speed_label.config(text=""))
+            job_ui(job, lambda: progress_bar.configure(value=100))
+            job_ui(job, lambda: progress_label.config(text="100%"))
+            job_ui(job, lambda: speed_label.config(text=""))
 
     # Use playlist-wide progress if playlist, else normal
     if is_playlist_mode:
         ydl_opts['progress_hooks'] = [playlist_progress_hook]
     else:
-        ydl_opts['progress_hooks'] = [progress_hook]
+        ydl_opts['progress_hooks'] = [lambda d: progress_hook(d, job)]
+
+    # Only the clip ranges are fetched: ffmpeg seeks in the source and copies
+    # from the keyframe before each start, or re-encodes the cuts when exact
+    if clip_ranges:
+        ydl_opts['download_ranges'] = download_range_func(None, clip_ranges)
+        ydl_opts['force_keyframes_at_cuts'] = bool(job.get('exact_cuts'))
+
+    # Fragments in flight follow the measured throughput unless a fixed count was chosen
+    fixed_fragments = FRAGMENT_CHOICES.get(job.get('fragments'))
+    if fixed_fragments is None:
+        fragment_concurrency = FragmentConcurrency()
+        ydl_opts['fragment_concurrency'] = fragment_concurrency
+        ydl_opts['progress_hooks'].append(fragment_concurrency.progress_hook)
+    else:
+        ydl_opts['concurrent_fragment_downloads'] = fixed_fragments
+
+    # Per-path throughput, so slow paths can be ejected
+    ydl_opts['progress_hooks'].append(network_paths.meter(job))
+
+    # Checksums are computed while the files are written (MP3s are converted
+    # afterwards, so those are hashed once the conversion is done)
+    hasher = InlineHasher(job['hash']) if job.get('hash') in HASH_ALGORITHMS else None
+    if hasher is not None:
+        if format_choice != "MP3 (Audio Only)":
+            ydl_opts['inline_hasher'] = hasher
+        ydl_opts['post_hooks'] = [hasher.finalize]
+
+    # Thumbnail/subtitles download alongside the video and go into the merge pass
+    if job.get('sidecars') and format_choice in ("MP4 (Video + Audio)", "MP4 (Facebook Video)"):
+        sidecar_progress_hook, ydl_opts['merge_sidecars'] = make_sidecar_hooks(job, ydl_opts)
+        ydl_opts['progress_hooks'].append(sidecar_progress_hook)
+
+    # Store each video once and link it into the folders (clips are cut per job, so they are not stored)
+    link_mode = LIBRARY_LINK_MODES.get(job.get('library'))
+    library = MediaLibrary(folder, link_mode, library_profile(job)) if link_mode and not clip_ranges else None
 
     retry_count = 3
+    failed_entries = 0
+    # Playlists are streamed entry by entry and retried per entry
+    if is_playlist_mode:
+        failed_entries = download_playlist_streaming(job, info, ydl_opts,
+                                                     int(playlist_start) if playlist_start.isdigit() else None,
+                                                     int(playlist_end) if playlist_end.isdigit() else None,
+                                                     retries=retry_count, library=library)
+        retry_count = 0
+    elif library is not None and info is not None and info.get('_type', 'video') == 'video':
+        with ydl_pool.session(ydl_opts) as ydl:
+            if library.link_entry(ydl, info):
+                retry_count = 0
     while retry_count > 0:
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with ydl_pool.session(ydl_opts) as ydl:
+                if info is not None and info.get('_type', 'video') == 'video':
+                    # Already extracted: go straight to format selection and download
+                    downloaded = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                else:
+                    downloaded = ydl.extract_info(url)
+            if library is not None:
+                library.ingest(downloaded)
             break
         except Exception as e:
-            print("[yt-dlp ERROR]", e)
-            if retry_count > 1 and not cancel_download:
+            if not job['cancel'].is_set():
+                # Folds into the logger's report of the same error, if it made one
+                event_bus.publish('error', "yt-dlp error", e, job)
+            # The extracted format URLs may have gone stale; extract again on retry
+            info = None
+            # A blocked path is ejected and the retry goes out another way
+            if network_paths.report_error(job, e):
+                ydl_opts.update(network_path_opts(job))
+            if retry_count > 1 and not job['cancel'].is_set():
                 retry_count -= 1
-                root.after(0, lambda: status_icon_label.config(text="!", fg=COLORS["status_warn"]))
-                root.after(0, lambda: status_label.config(text=f"Retrying... ({retry_count} attempts left)", fg=COLORS["status_warn"]))
+                job_ui(job, lambda: status_icon_label.config(text="!", fg=COLORS["status_warn"]))
+                job_ui(job, lambda: status_label.config(text=f"Retrying... ({retry_count} attempts left)", fg=COLORS["status_warn"]))
                 continue
             raise e
 
-    if not cancel_download:
-        save_to_history(url, video_title, format_choice, quality_choice)
-        root.after(0, lambda: status_icon_label.config(text="✓", fg=COLORS["status_success"]))
-        root.after(0, lambda: status_label.config(text="Download completed!", fg=COLORS["status_success"]))
-        def show_success_and_reset():
-            messagebox.showinfo("Success", "Download completed successfully.")
+    if not job['cancel'].is_set():
+        save_to_history(url, video_title, format_choice, quality_choice,
+                        {key: job.get(key) for key in HISTORY_OPTION_KEYS},
+                        hasher.files if hasher is not None else None)
+        if failed_entries:
+            job_ui(job, lambda: status_icon_label.config(text="!", fg=COLORS["status_warn"]))
+            job_ui(job, lambda: status_label.config(
+                text=f"Completed, {failed_entries} failed (see Alerts)", fg=COLORS["status_warn"]))
+        else:
+            job_ui(job, lambda: status_icon_label.config(text="✓", fg=COLORS["status_success"]))
+            job_ui(job, lambda: status_label.config(text="Download completed!", fg=COLORS["status_success"]))
+        event_bus.publish('info', "Download completed", f"Saved to {final_folder}", job)
+        others_running = scheduler.has_other_work()
+        def reset_after_success():
+            if others_running:
+                return
             progress_bar.configure(value=0)
             progress_label.config(text="")
             set_unified_btn_mode("download")
             unified_btn.config(state="normal")
-        root.after(0, show_success_and_reset)
+        job_ui(job, reset_after_success)
 
-def progress_hook(d):
-    global cancel_download, download_in_progress
-    global progress_max_percent
-    if cancel_download:
-        download_in_progress = False
+def run_download_job(job):
+    """Scheduler entry point: run the download on a network path from the pool."""
+    show_job(job)
+    try:
+        # Sessions the job holds on to (a playlist's resolving session) go back when it ends
+        with network_paths.lease(job), ExitStack() as job['sessions']:
+            download_task(job)
+    except Exception as e:
+        if not job['cancel'].is_set():
+            report_job_failure(job, "Download failed", e)
+    finally:
+        release_job(job)
+        event_bus.forget_job(job)
+
+
+def progress_hook(d, job):
+    if job['cancel'].is_set():
         raise Exception("Download cancelled by user")
 
 
@@ -619,11 +3356,10 @@ def progress_hook(d):
         d.get('status') in ('started', 'pre_process')
         or (d.get('status') == 'downloading' and d.get('fragment_index', 0) == 0 and d.get('downloaded_bytes', 0) == 0)
     ):
-        global progress_max_percent
-        progress_max_percent = 0
-        root.after(0, lambda: progress_bar.grid())
-        root.after(0, lambda: progress_bar.configure(value=0))
-        root.after(0, lambda: progress_label.config(text="0%"))
+        job['progress_max'] = 0
+        job_ui(job, lambda: progress_bar.grid())
+        job_ui(job, lambda: progress_bar.configure(value=0))
+        job_ui(job, lambda: progress_label.config(text="0%"))
 
     if d['status'] == 'downloading':
         downloaded = d.get('downloaded_bytes', 0)
@@ -632,255 +3368,45 @@ def progress_hook(d):
         speed = d.get('speed', 0)
 
         # Only allow progress to move forward (merge audio/video into one bar)
-        if percent > progress_max_percent:
-            progress_max_percent = percent
+        if percent > job['progress_max']:
+            job['progress_max'] = percent
         else:
-            percent = progress_max_percent
-
-        def format_size(bytes):
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if bytes < 1024:
-                    return f"{bytes:.1f} {unit}"
-                bytes /= 1024
-            return f"{bytes:.1f} GB"
+            percent = job['progress_max']
 
         downloaded_str = format_size(downloaded)
         total_str = format_size(total)
         speed_str = format_size(speed) + "/s" if speed else "N/A"
 
         status_text = f"{downloaded_str} of {total_str} ({speed_str})"
-        root.after(0, lambda: progress_bar.configure(value=percent))
-        root.after(0, lambda: progress_label.config(text=f"{percent}%"))
-        root.after(0, lambda: speed_label.config(text=f"Speed: {speed_str}"))
-        root.after(0, lambda: status_icon_label.config(text="⬇️", fg=COLORS["status_info"]))
-        root.after(0, lambda: status_label.config(text=status_text, fg=COLORS["status_info"]))
+        job_ui(job, lambda: progress_bar.configure(value=percent))
+        job_ui(job, lambda: progress_label.config(text=f"{percent}%"))
+        job_ui(job, lambda: speed_label.config(text=f"Speed: {speed_str}"))
+        job_ui(job, lambda: status_icon_label.config(text="⬇️", fg=COLORS["status_info"]))
+        job_ui(job, lambda: status_label.config(text=status_text, fg=COLORS["status_info"]))
     elif d['status'] == 'finished':
-        root.after(0, lambda: progress_bar.configure(value=100))
-        root.after(0, lambda: progress_label.config(text="100%"))
+        job_ui(job, lambda: progress_bar.configure(value=100))
+        job_ui(job, lambda: progress_label.config(text="100%"))
 
 
 class MyLogger:
+    """yt-dlp logger: warnings and errors go to the event bus, tagged with the job."""
+    def __init__(self, job=None):
+        self.job = job
     def debug(self, _): pass
-    def warning(self, _): pass
+    def warning(self, msg):
+        event_bus.publish('warning', "yt-dlp warning", msg, self.job)
     def error(self, msg):
-        messagebox.showerror("Error", msg)
-
-# Tkinter Variables
-download_path = tk.StringVar(value=os.path.join(os.path.expanduser("~"), "Downloads"))
-
-
-# --- Section Headings ---
-section_label = tk.Label(root, text="Download Options", font=("Segoe UI", 13, "bold"), bg=COLORS["bg"], fg=COLORS["label_fg"])
-section_label.grid(row=0, column=0, sticky="w", padx=20, pady=(10, 0))
-
-fields_frame = tk.Frame(root, bg=COLORS["section_bg"], highlightbackground=COLORS["section_border"], highlightthickness=1)
-fields_frame.grid(row=1, column=0, padx=20, pady=5, sticky="ew")
-fields_frame.grid_columnconfigure(1, weight=1)
-fields_frame.grid_columnconfigure(2, weight=0)
-
-label_width = 18
-entry_width = 42
-
-
-
-# Row 1 - URL (improved alignment)
-url_label = tk.Label(fields_frame, text="YouTube Video URL:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
-url_label.grid(row=0, column=0, sticky="w", pady=5)
-url_entry = RoundedEntry(fields_frame, width=32, font=("Segoe UI", 11))
-url_entry.insert(0, "Video URL")
-url_entry.config(fg=COLORS["disabled_fg"])
-url_entry.grid(row=0, column=1, pady=5, sticky="ew")
-
-
-# --- URL Entry Placeholder Logic ---
-def on_url_click(_):
-    if url_entry.get() == "Video URL":
-        url_entry.delete(0, tk.END)
-        url_entry.config(fg=COLORS["entry_fg"])
-
-def on_url_focusout(_):
-    if url_entry.get() == '':
-        url_entry.insert(0, "Video URL")
-        url_entry.config(fg=COLORS["disabled_fg"])
-
-url_entry.bind('<FocusIn>', on_url_click)
-url_entry.bind('<FocusOut>', on_url_focusout)
-
-# Initial state for playlist checkbutton (must be after playlist_check is created)
-
-# Define is_playlist_url and update_playlist_check_and_enable after playlist_check is created
-
-# Row 2 - Folder (improved alignment)
-folder_label = tk.Label(fields_frame, text="Download Folder:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
-folder_label.grid(row=1, column=0, sticky="w", pady=5)
-folder_entry = RoundedEntry(fields_frame, textvariable=download_path, width=28, font=("Segoe UI", 11))
-folder_entry.grid(row=1, column=1, pady=5, sticky="ew")
-ttButton = ttk.Button(fields_frame, text="Browse", command=browse_folder, style="outline.TButton", width=8)
-ttButton.grid(row=1, column=2, padx=(4,20), pady=5, sticky="ew")
-
-
-# Row 3 - Format
-format_label = tk.Label(fields_frame, text="Format:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
-format_label.grid(row=2, column=0, sticky="w", pady=5)
-format_var = tk.StringVar(value="MP4 (Video + Audio)")
-
-# --- Modernized Combobox for Format ---
-
-# Set width to 20 to prevent overflow and improve alignment
-format_menu = ttk.Combobox(fields_frame, textvariable=format_var,
-    values=["MP4 (Video + Audio)", "MP4 (Video Only)", "MP3 (Audio Only)", "MP4 (Facebook Video)"],
-    state="readonly", width=20)
-format_menu.grid(row=2, column=1, pady=5, padx=(0, 5), sticky="ew")
-
-
-# Row 4 - Quality
-quality_label = tk.Label(fields_frame, text="Quality:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
-quality_label.grid(row=3, column=0, sticky="w", pady=5)
-
-quality_var = tk.StringVar(value="1080p")
-
-# --- Modernized Combobox for Quality ---
-
-# Set width to 20 to prevent overflow and improve alignment
-quality_menu = ttk.Combobox(fields_frame, textvariable=quality_var,
-    values=["2160p (4K)", "1440p (2K)", "1080p", "720p", "480p", "360p"],
-    state="readonly", width=20)
-quality_menu.grid(row=3, column=1, pady=5, padx=(0, 5), sticky="ew")
-
-# --- Disable/enable quality dropdown based on format selection ---
-def update_quality_state(*_):
-    if format_var.get() == "MP3 (Audio Only)":
-        quality_menu.config(state="disabled")
-    else:
-        quality_menu.config(state="readonly")
-
-# Initial state
-update_quality_state()
-# Trace format_var changes
-format_var.trace_add('write', update_quality_state)
-
-# Row 5 - Playlist Options
-
-
-# Playlist row: align with label and entry columns
-playlist_label = tk.Label(fields_frame, text="", bg=COLORS["section_bg"], width=label_width)
-playlist_label.grid(row=4, column=0, sticky="w", pady=5)
-playlist_frame = tk.Frame(fields_frame, bg=COLORS["section_bg"])
-playlist_frame.grid(row=4, column=1, columnspan=2, pady=5, sticky="ew")
-
-
-
-playlist_var = tk.BooleanVar(value=False)
-
-style.configure("Tick.TCheckbutton",
-    font=("Segoe UI", 11),
-    background=COLORS["section_bg"],
-    foreground=COLORS["fg"],
-    padding=6,
-    focuscolor=COLORS["highlight"],
-    borderwidth=0
-)
-style.map("Tick.TCheckbutton",
-    background=[("active", COLORS["section_bg"]), ("!active", COLORS["section_bg"])],
-    foreground=[("active", COLORS["highlight"]), ("selected", COLORS["highlight"]), ("!selected", COLORS["fg"])]
-)
-playlist_check = ttk.Checkbutton(
-    playlist_frame,
-    text="Download Playlist",
-    variable=playlist_var,
-    style="Tick.TCheckbutton"
-)
-playlist_check.pack(side=tk.LEFT, padx=(0, 5), pady=2, anchor="w")
-
-
-# Use a Unicode tick (✓) as the label, and hide the indicator for a modern look
-style = ttk.Style()
-style.layout('Tick.TCheckbutton', [
-    ('Checkbutton.padding', {'children': [
-        ('Checkbutton.label', {'side': 'left', 'sticky': ''})
-    ]})
-])
-def update_playlist_check():
-    if playlist_var.get():
-        playlist_check.config(text='Download Playlist ✓')
-    else:
-        playlist_check.config(text='Download Playlist')
-playlist_var.trace_add('write', lambda *_: update_playlist_check())
-update_playlist_check()
-
-playlist_start_var = tk.StringVar()
-
-
-playlist_start_label = tk.Label(playlist_frame, text="Start:", bg=COLORS["section_bg"], fg=COLORS["label_fg"])
-playlist_start_label.pack(side=tk.LEFT, padx=5)
-playlist_start_entry = RoundedEntry(playlist_frame, textvariable=playlist_start_var, width=5)
-playlist_start_entry.pack(side=tk.LEFT, padx=2)
-
-playlist_end_var = tk.StringVar()
-playlist_end_label = tk.Label(playlist_frame, text="End:", bg=COLORS["section_bg"], fg=COLORS["label_fg"])
-playlist_end_label.pack(side=tk.LEFT, padx=5)
-playlist_end_entry = RoundedEntry(playlist_frame, textvariable=playlist_end_var, width=5)
-playlist_end_entry.pack(side=tk.LEFT, padx=2)
-
-# Function to update playlist start/end highlight and state
-def update_playlist_fields(*_):
-    if playlist_var.get():
-        playlist_start_entry.config(state='normal', highlightbackground=COLORS["highlight"], highlightcolor=COLORS["highlight"])
-        playlist_end_entry.config(state='normal', highlightbackground=COLORS["highlight"], highlightcolor=COLORS["highlight"])
-        playlist_start_label.config(fg=COLORS["highlight"])
-        playlist_end_label.config(fg=COLORS["highlight"])
-    else:
-        playlist_start_entry.config(state='disabled', highlightbackground=COLORS["section_border"], highlightcolor=COLORS["section_border"])
-        playlist_end_entry.config(state='disabled', highlightbackground=COLORS["section_border"], highlightcolor=COLORS["section_border"])
-        playlist_start_label.config(fg=COLORS["disabled_fg"])
-        playlist_end_label.config(fg=COLORS["disabled_fg"])
-
-# Initial state
-update_playlist_fields()
-# Trace playlist_var changes
-playlist_var.trace_add('write', update_playlist_fields)
-
-
-
-# Row 6 - Filename (improved alignment)
-filename_label = tk.Label(fields_frame, text="Filename:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
-filename_label.grid(row=5, column=0, sticky="w", pady=5)
-filename_entry = RoundedEntry(fields_frame, width=32, font=("Segoe UI", 11))
-filename_entry.insert(0, "Filename is optional")
-filename_entry.config(fg=COLORS["disabled_fg"])
-filename_entry.grid(row=5, column=1, pady=5, sticky="ew")
-
-
-# --- Filename Entry Placeholder Logic ---
-def on_entry_click(_):
-    if filename_entry.get() == "Filename is optional":
-        filename_entry.delete(0, tk.END)
-        filename_entry.config(fg=COLORS["entry_fg"])
-
-def on_focusout(_):
-    if filename_entry.get() == '':
-        filename_entry.insert(0, "Filename is optional")
-        filename_entry.config(fg=COLORS["disabled_fg"])
-
-filename_entry.bind('<FocusIn>', on_entry_click)
-filename_entry.bind('<FocusOut>', on_focusout)
-
-
-# --- Section for actions ---
-
-
-buttons_frame = tk.Frame(root, bg=COLORS["bg"])
-buttons_frame.grid(row=3, column=0, pady=10)
+        if self.job is not None and self.job['cancel'].is_set():
+            return  # the cancel itself surfaces as an error; nothing to report
+        event_bus.publish('error', "yt-dlp error", msg, self.job)
 
+event_bus = EventBus()
+ydl_pool = YoutubeDLPool()
 
 
+# --- Main window ---
 unified_btn_state = {"mode": "download", "delay_active": False}
 
-def unified_btn_action():
-    if unified_btn_state["mode"] == "download":
-        download_video()
-    elif unified_btn_state["mode"] == "cancel":
-        cancel_download_task()
 
 def set_unified_btn_mode(mode, delay=0):
     # mode: "download" or "cancel"
@@ -901,53 +3427,6 @@ def set_unified_btn_mode(mode, delay=0):
         _set()
 
 
-# --- Modernized pill-shaped buttons with extra padding ---
-unified_btn = ttk.Button(buttons_frame, text="Download", command=unified_btn_action, width=12, style="outline.TButton")
-unified_btn.pack(side=tk.LEFT, padx=10, pady=4)
-
-ttHistory = ttk.Button(buttons_frame, text="History", command=show_history, width=12, style="outline.TButton")
-ttHistory.pack(side=tk.LEFT, padx=10, pady=4)
-
-
-
-# Add event handlers to save settings when changed
-def on_setting_changed(*_):
-    save_settings()
-
-format_var.trace_add('write', on_setting_changed)
-quality_var.trace_add('write', on_setting_changed)
-download_path.trace_add('write', on_setting_changed)
-
-# --- Settings persistence ---
-
-def save_settings():
-    settings = {
-        'download_path': download_path.get(),
-        'format': format_var.get(),
-        'quality': quality_var.get()
-    }
-    try:
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f)
-    except Exception as e:
-        print(f"Error saving settings: {e}")
-
-def load_settings():
-    try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
-            download_path.set(settings.get('download_path', os.path.join(os.path.expanduser("~"), "Downloads")))
-            format_var.set(settings.get('format', "MP4 (Video + Audio)"))
-            quality_var.set(settings.get('quality', "1080p"))
-    except Exception as e:
-        print(f"Error loading settings: {e}")
-
-# Load settings before mainloop
-load_settings()
-
-
-# --- Tooltips ---
 def add_tooltip(widget, text):
     tooltip = tk.Toplevel(widget)
     tooltip.withdraw()
@@ -965,51 +3444,483 @@ def add_tooltip(widget, text):
     widget.bind("<Enter>", enter)
     widget.bind("<Leave>", leave)
 
-add_tooltip(url_entry, "Paste a YouTube or playlist URL here.")
-add_tooltip(folder_entry, "Choose where to save your downloads.")
-add_tooltip(format_menu, "Select the output format.")
-add_tooltip(quality_menu, "Select the maximum video quality. (Disabled for audio-only downloads)")
-add_tooltip(playlist_check, "Enable to download all videos in a playlist.")
-add_tooltip(playlist_start_entry, "First video in playlist to download (optional).")
-add_tooltip(playlist_end_entry, "Last video in playlist to download (optional).")
-add_tooltip(filename_entry, "Custom filename (optional). For playlists, index is appended.")
-add_tooltip(unified_btn, "Start downloading the video or playlist. When downloading, becomes Cancel.")
-add_tooltip(ttHistory, "View download history.")
-
-
-# --- Collecting Information Label (placed below buttons) ---
-collecting_label = tk.Label(root, text="", font=("Segoe UI", 10, "italic"), fg=COLORS["status_info"], bg=COLORS["bg"])
-collecting_label.grid(row=4, column=0, pady=(0, 2), sticky="n")
-collecting_label.grid_remove()  # Hide initially
-
-# --- Progress and status ---
-progress_frame = tk.Frame(root, bg=COLORS["bg"])
-progress_frame.grid(row=5, column=0, pady=5, sticky="ew")
-progress_frame.grid_columnconfigure(0, weight=1)
-
-
-# Progress bar
-progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=450, mode="determinate")
-progress_bar.grid(row=0, column=0, sticky="ew")
-
-# Frame for speed and percent (side by side, below progress bar)
-speed_percent_frame = tk.Frame(progress_frame, bg=COLORS["bg"])
-speed_percent_frame.grid(row=1, column=0, sticky="ew", pady=(2, 0))
-speed_percent_frame.grid_columnconfigure(0, weight=1)
-speed_percent_frame.grid_columnconfigure(1, weight=0)
-
-# Speed label (left, expands)
-speed_label = tk.Label(speed_percent_frame, text="", font=("Segoe UI", 9), fg=COLORS["fg"], bg=COLORS["bg"])
-speed_label.grid(row=0, column=0, sticky="w")
-# Percent label (right, bold)
-progress_label = tk.Label(speed_percent_frame, text="", font=("Segoe UI", 10, "bold"), fg=COLORS["fg"], bg=COLORS["bg"])
-progress_label.grid(row=0, column=1, sticky="e", padx=(8, 0))
-
-# Status label with icon
-status_icon_label = tk.Label(root, text="", font=("Segoe UI", 13), bg=COLORS["bg"])
-status_icon_label.grid(row=6, column=0, sticky="w", padx=20)
-status_label = tk.Label(root, text="", font=("Segoe UI", 10), bg=COLORS["bg"], fg=COLORS["fg"])
-status_label.grid(row=7, column=0, sticky="w", padx=50)
-
-# Start the main loop (this should be the last line)
-root.mainloop()
+
+def build_main_window():
+    """Create the main window. The widgets and variables the rest of the app
+    reads (and the harness replaces) are module globals."""
+    global root, url_entry, download_path, format_var, quality_var, quality_menu
+    global playlist_var, playlist_start_var, playlist_end_var, filename_entry, clip_entry, exact_cuts_var
+    global sidecars_var, hash_var, live_mode_var, live_split_var, fragments_var, library_var
+    global prefetch_label, unified_btn, ttAlerts, collecting_label
+    global progress_bar, progress_label, speed_label, status_icon_label, status_label
+
+
+    # Set up the main window
+    root = tk.Tk()
+    root.title("YouTube Video Downloader")
+    root.geometry("550x635")
+    root.resizable(False, False)
+    root.configure(bg=COLORS["bg"])
+
+    # Style configuration
+    style = ttk.Style()
+    style.theme_use('clam')
+    style.configure("TCombobox",
+                    fieldbackground=COLORS["entry_bg"],
+                    background=COLORS["bg"],
+                    font=("Segoe UI", 11),
+                    foreground=COLORS["fg"])
+    style.configure("TProgressbar",
+                    thickness=10,
+                    troughcolor=COLORS["progress_trough"],
+                    background=COLORS["progress_bg"],
+                    bordercolor=COLORS["progress_trough"])
+    # --- Pill-shaped button style (ttk limitation: corners may not be truly rounded on Windows) ---
+    # This style increases padding and removes border for a modern look, but true pill/rounded corners require a custom widget or third-party library.
+    style.configure("Pill.TButton",
+        font=("Segoe UI", 10),
+        background=COLORS["button_bg"],
+        foreground=COLORS["button_fg"],
+        padding=(18, 8),  # More horizontal and vertical padding
+        borderwidth=0,
+        relief="flat"
+    )
+    style.map("Pill.TButton",
+        background=[("active", COLORS["button_active"]), ("!active", COLORS["button_bg"])],
+        foreground=[("disabled", COLORS["disabled_fg"]), ("!disabled", COLORS["button_fg"])])
+    # Note: True rounded corners are not supported by ttk on Windows. For a more modern look, consider using a custom image or a third-party widget.
+
+    # Set app icon if available
+    try:
+        if os.path.exists("icon.ico"):
+            root.iconbitmap("icon.ico")
+
+    except Exception as e:
+        print("Icon not set:", e)
+
+    # Tkinter Variables
+    download_path = tk.StringVar(value=os.path.join(os.path.expanduser("~"), "Downloads"))
+
+    # --- Section Headings ---
+    section_label = tk.Label(root, text="Download Options", font=("Segoe UI", 13, "bold"), bg=COLORS["bg"], fg=COLORS["label_fg"])
+    section_label.grid(row=0, column=0, sticky="w", padx=20, pady=(10, 0))
+
+    fields_frame = tk.Frame(root, bg=COLORS["section_bg"], highlightbackground=COLORS["section_border"], highlightthickness=1)
+    fields_frame.grid(row=1, column=0, padx=20, pady=5, sticky="ew")
+    fields_frame.grid_columnconfigure(1, weight=1)
+    fields_frame.grid_columnconfigure(2, weight=0)
+
+    label_width = 18
+    entry_width = 42
+
+    # Row 1 - URL (improved alignment)
+    url_label = tk.Label(fields_frame, text="YouTube Video URL:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    url_label.grid(row=0, column=0, sticky="w", pady=5)
+    url_entry = RoundedEntry(fields_frame, width=32, font=("Segoe UI", 11))
+    url_entry.insert(0, "Video URL")
+    url_entry.config(fg=COLORS["disabled_fg"])
+    url_entry.grid(row=0, column=1, pady=5, sticky="ew")
+
+    # --- URL Entry Placeholder Logic ---
+    def on_url_click(_):
+        if url_entry.get() == "Video URL":
+            url_entry.delete(0, tk.END)
+            url_entry.config(fg=COLORS["entry_fg"])
+
+    def on_url_focusout(_):
+        if url_entry.get() == '':
+            url_entry.insert(0, "Video URL")
+            url_entry.config(fg=COLORS["disabled_fg"])
+        start_metadata_prefetch()
+
+    url_entry.bind('<FocusIn>', on_url_click)
+    url_entry.bind('<FocusOut>', on_url_focusout)
+    # The pasted text is inserted after this binding runs, so look it up a moment later
+    url_entry.bind('<<Paste>>', lambda _: root.after(50, start_metadata_prefetch))
+
+    # Initial state for playlist checkbutton (must be after playlist_check is created)
+
+    # Define is_playlist_url and update_playlist_check_and_enable after playlist_check is created
+
+    # Row 2 - Folder (improved alignment)
+    folder_label = tk.Label(fields_frame, text="Download Folder:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    folder_label.grid(row=1, column=0, sticky="w", pady=5)
+    folder_entry = RoundedEntry(fields_frame, textvariable=download_path, width=28, font=("Segoe UI", 11))
+    folder_entry.grid(row=1, column=1, pady=5, sticky="ew")
+    ttButton = ttk.Button(fields_frame, text="Browse", command=browse_folder, style="outline.TButton", width=8)
+    ttButton.grid(row=1, column=2, padx=(4,20), pady=5, sticky="ew")
+
+    # Row 3 - Format
+    format_label = tk.Label(fields_frame, text="Format:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    format_label.grid(row=2, column=0, sticky="w", pady=5)
+    format_var = tk.StringVar(value="MP4 (Video + Audio)")
+
+    # --- Modernized Combobox for Format ---
+
+    # Set width to 20 to prevent overflow and improve alignment
+    format_menu = ttk.Combobox(fields_frame, textvariable=format_var,
+        values=["MP4 (Video + Audio)", "MP4 (Video Only)", "MP3 (Audio Only)", "MP4 (Facebook Video)"],
+        state="readonly", width=20)
+    format_menu.grid(row=2, column=1, pady=5, padx=(0, 5), sticky="ew")
+
+    # Row 4 - Quality
+    quality_label = tk.Label(fields_frame, text="Quality:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    quality_label.grid(row=3, column=0, sticky="w", pady=5)
+
+    quality_var = tk.StringVar(value="1080p")
+
+    # --- Modernized Combobox for Quality ---
+
+    # Set width to 20 to prevent overflow and improve alignment
+    quality_menu = ttk.Combobox(fields_frame, textvariable=quality_var,
+        values=["2160p (4K)", "1440p (2K)", "1080p", "720p", "480p", "360p"],
+        state="readonly", width=20)
+    quality_menu.grid(row=3, column=1, pady=5, padx=(0, 5), sticky="ew")
+
+    # --- Disable/enable quality dropdown based on format selection ---
+    def update_quality_state(*_):
+        if format_var.get() == "MP3 (Audio Only)":
+            quality_menu.config(state="disabled")
+        else:
+            quality_menu.config(state="readonly")
+
+    # Initial state
+    update_quality_state()
+    # Trace format_var changes
+    format_var.trace_add('write', update_quality_state)
+
+    # Row 5 - Playlist Options
+
+    # Playlist row: align with label and entry columns
+    playlist_label = tk.Label(fields_frame, text="", bg=COLORS["section_bg"], width=label_width)
+    playlist_label.grid(row=4, column=0, sticky="w", pady=5)
+    playlist_frame = tk.Frame(fields_frame, bg=COLORS["section_bg"])
+    playlist_frame.grid(row=4, column=1, columnspan=2, pady=5, sticky="ew")
+
+    playlist_var = tk.BooleanVar(value=False)
+
+    style.configure("Tick.TCheckbutton",
+        font=("Segoe UI", 11),
+        background=COLORS["section_bg"],
+        foreground=COLORS["fg"],
+        padding=6,
+        focuscolor=COLORS["highlight"],
+        borderwidth=0
+    )
+    style.map("Tick.TCheckbutton",
+        background=[("active", COLORS["section_bg"]), ("!active", COLORS["section_bg"])],
+        foreground=[("active", COLORS["highlight"]), ("selected", COLORS["highlight"]), ("!selected", COLORS["fg"])]
+    )
+    playlist_check = ttk.Checkbutton(
+        playlist_frame,
+        text="Download Playlist",
+        variable=playlist_var,
+        style="Tick.TCheckbutton"
+    )
+    playlist_check.pack(side=tk.LEFT, padx=(0, 5), pady=2, anchor="w")
+
+    # Use a Unicode tick (✓) as the label, and hide the indicator for a modern look
+    style = ttk.Style()
+    style.layout('Tick.TCheckbutton', [
+        ('Checkbutton.padding', {'children': [
+            ('Checkbutton.label', {'side': 'left', 'sticky': ''})
+        ]})
+    ])
+    def update_playlist_check():
+        if playlist_var.get():
+            playlist_check.config(text='Download Playlist ✓')
+        else:
+            playlist_check.config(text='Download Playlist')
+    playlist_var.trace_add('write', lambda *_: update_playlist_check())
+    update_playlist_check()
+
+    playlist_start_var = tk.StringVar()
+
+    playlist_start_label = tk.Label(playlist_frame, text="Start:", bg=COLORS["section_bg"], fg=COLORS["label_fg"])
+    playlist_start_label.pack(side=tk.LEFT, padx=5)
+    playlist_start_entry = RoundedEntry(playlist_frame, textvariable=playlist_start_var, width=5)
+    playlist_start_entry.pack(side=tk.LEFT, padx=2)
+
+    playlist_end_var = tk.StringVar()
+    playlist_end_label = tk.Label(playlist_frame, text="End:", bg=COLORS["section_bg"], fg=COLORS["label_fg"])
+    playlist_end_label.pack(side=tk.LEFT, padx=5)
+    playlist_end_entry = RoundedEntry(playlist_frame, textvariable=playlist_end_var, width=5)
+    playlist_end_entry.pack(side=tk.LEFT, padx=2)
+
+    # Function to update playlist start/end highlight and state
+    def update_playlist_fields(*_):
+        if playlist_var.get():
+            playlist_start_entry.config(state='normal', highlightbackground=COLORS["highlight"], highlightcolor=COLORS["highlight"])
+            playlist_end_entry.config(state='normal', highlightbackground=COLORS["highlight"], highlightcolor=COLORS["highlight"])
+            playlist_start_label.config(fg=COLORS["highlight"])
+            playlist_end_label.config(fg=COLORS["highlight"])
+        else:
+            playlist_start_entry.config(state='disabled', highlightbackground=COLORS["section_border"], highlightcolor=COLORS["section_border"])
+            playlist_end_entry.config(state='disabled', highlightbackground=COLORS["section_border"], highlightcolor=COLORS["section_border"])
+            playlist_start_label.config(fg=COLORS["disabled_fg"])
+            playlist_end_label.config(fg=COLORS["disabled_fg"])
+
+    # Initial state
+    update_playlist_fields()
+    # Trace playlist_var changes
+    playlist_var.trace_add('write', update_playlist_fields)
+
+    # Row 6 - Filename (improved alignment)
+    filename_label = tk.Label(fields_frame, text="Filename:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    filename_label.grid(row=5, column=0, sticky="w", pady=5)
+    filename_entry = RoundedEntry(fields_frame, width=32, font=("Segoe UI", 11))
+    filename_entry.insert(0, "Filename is optional")
+    filename_entry.config(fg=COLORS["disabled_fg"])
+    filename_entry.grid(row=5, column=1, pady=5, sticky="ew")
+
+    # --- Filename Entry Placeholder Logic ---
+    def on_entry_click(_):
+        if filename_entry.get() == "Filename is optional":
+            filename_entry.delete(0, tk.END)
+            filename_entry.config(fg=COLORS["entry_fg"])
+
+    def on_focusout(_):
+        if filename_entry.get() == '':
+            filename_entry.insert(0, "Filename is optional")
+            filename_entry.config(fg=COLORS["disabled_fg"])
+
+    filename_entry.bind('<FocusIn>', on_entry_click)
+    filename_entry.bind('<FocusOut>', on_focusout)
+
+    # Row 7 - Clip ranges (optional)
+    clip_label = tk.Label(fields_frame, text="Clip:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    clip_label.grid(row=6, column=0, sticky="w", pady=5)
+    clip_frame = tk.Frame(fields_frame, bg=COLORS["section_bg"])
+    clip_frame.grid(row=6, column=1, columnspan=2, pady=5, sticky="ew")
+    clip_entry = RoundedEntry(clip_frame, width=26, font=("Segoe UI", 11))
+    clip_entry.insert(0, CLIP_PLACEHOLDER)
+    clip_entry.config(fg=COLORS["disabled_fg"])
+    clip_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    exact_cuts_var = tk.BooleanVar(value=False)
+    exact_cuts_check = ttk.Checkbutton(clip_frame, text="Exact", variable=exact_cuts_var, style="Tick.TCheckbutton")
+    exact_cuts_check.pack(side=tk.LEFT, padx=(5, 0))
+    exact_cuts_var.trace_add('write', lambda *_: exact_cuts_check.config(text='Exact ✓' if exact_cuts_var.get() else 'Exact'))
+
+    def on_clip_click(_):
+        if clip_entry.get() == CLIP_PLACEHOLDER:
+            clip_entry.delete(0, tk.END)
+            clip_entry.config(fg=COLORS["entry_fg"])
+
+    def on_clip_focusout(_):
+        if clip_entry.get() == '':
+            clip_entry.insert(0, CLIP_PLACEHOLDER)
+            clip_entry.config(fg=COLORS["disabled_fg"])
+        update_prefetch_label()
+
+    clip_entry.bind('<FocusIn>', on_clip_click)
+    clip_entry.bind('<FocusOut>', on_clip_focusout)
+
+    # Row 8 - Embedded extras
+    sidecars_var = tk.BooleanVar(value=False)
+    sidecars_check = ttk.Checkbutton(
+        fields_frame,
+        text="Embed thumbnail, subtitles & chapters",
+        variable=sidecars_var,
+        style="Tick.TCheckbutton"
+    )
+    sidecars_check.grid(row=7, column=1, columnspan=2, pady=(0, 5), sticky="w")
+    def update_sidecars_check():
+        if sidecars_var.get():
+            sidecars_check.config(text='Embed thumbnail, subtitles & chapters ✓')
+        else:
+            sidecars_check.config(text='Embed thumbnail, subtitles & chapters')
+    sidecars_var.trace_add('write', lambda *_: update_sidecars_check())
+
+    # Row 9 - Checksum computed while downloading
+    hash_label = tk.Label(fields_frame, text="Checksum:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    hash_label.grid(row=8, column=0, sticky="w", pady=5)
+    hash_var = tk.StringVar(value="Off")
+    hash_menu = ttk.Combobox(fields_frame, textvariable=hash_var, values=list(HASH_CHOICES), state="readonly", width=20)
+    hash_menu.grid(row=8, column=1, pady=5, padx=(0, 5), sticky="ew")
+
+    # Row 10 - Live streams and premieres
+    live_label = tk.Label(fields_frame, text="Live:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    live_label.grid(row=9, column=0, sticky="w", pady=5)
+    live_frame = tk.Frame(fields_frame, bg=COLORS["section_bg"])
+    live_frame.grid(row=9, column=1, columnspan=2, pady=5, sticky="ew")
+    live_mode_var = tk.StringVar(value="Record from now")
+    live_mode_menu = ttk.Combobox(live_frame, textvariable=live_mode_var, values=list(LIVE_MODES), state="readonly", width=16)
+    live_mode_menu.pack(side=tk.LEFT, padx=(0, 5))
+    live_split_var = tk.StringVar(value="Don't split")
+    live_split_menu = ttk.Combobox(live_frame, textvariable=live_split_var, values=list(LIVE_SPLITS), state="readonly", width=20)
+    live_split_menu.pack(side=tk.LEFT)
+
+    # Row 11 - Fragments downloaded at once (HLS/DASH)
+    fragments_label = tk.Label(fields_frame, text="Fragments:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    fragments_label.grid(row=10, column=0, sticky="w", pady=5)
+    fragments_var = tk.StringVar(value="Auto")
+    fragments_menu = ttk.Combobox(fields_frame, textvariable=fragments_var, values=list(FRAGMENT_CHOICES), state="readonly", width=20)
+    fragments_menu.grid(row=10, column=1, pady=5, padx=(0, 5), sticky="ew")
+
+    # Row 12 - Store each video once and link it into folders
+    library_label = tk.Label(fields_frame, text="Library:", font=("Segoe UI", 11), bg=COLORS["section_bg"], fg=COLORS["label_fg"], width=label_width, anchor="w")
+    library_label.grid(row=11, column=0, sticky="w", pady=5)
+    library_var = tk.StringVar(value="Off")
+    library_menu = ttk.Combobox(fields_frame, textvariable=library_var, values=list(LIBRARY_LINK_MODES), state="readonly", width=20)
+    library_menu.grid(row=11, column=1, pady=5, padx=(0, 5), sticky="ew")
+
+    # --- Prefetched video details (title, qualities, size) ---
+    prefetch_label = tk.Label(root, text="", font=("Segoe UI", 9), fg=COLORS["status_info"], bg=COLORS["bg"], anchor="w")
+    prefetch_label.grid(row=2, column=0, sticky="ew", padx=20)
+    playlist_var.trace_add('write', start_metadata_prefetch)
+    format_var.trace_add('write', update_prefetch_label)
+    quality_var.trace_add('write', update_prefetch_label)
+
+    # --- Section for actions ---
+
+    buttons_frame = tk.Frame(root, bg=COLORS["bg"])
+    buttons_frame.grid(row=3, column=0, pady=10)
+
+    def unified_btn_action():
+        if unified_btn_state["mode"] == "download":
+            download_video()
+        elif unified_btn_state["mode"] == "cancel":
+            cancel_download_task()
+
+    # --- Modernized pill-shaped buttons with extra padding ---
+    unified_btn = ttk.Button(buttons_frame, text="Download", command=unified_btn_action, width=12, style="outline.TButton")
+    unified_btn.pack(side=tk.LEFT, padx=10, pady=4)
+
+    ttQueue = ttk.Button(buttons_frame, text="Add to Queue", command=download_video, width=12, style="outline.TButton")
+    ttQueue.pack(side=tk.LEFT, padx=10, pady=4)
+
+    ttHistory = ttk.Button(buttons_frame, text="History", command=show_history, width=12, style="outline.TButton")
+    ttHistory.pack(side=tk.LEFT, padx=10, pady=4)
+
+    ttAlerts = ttk.Button(buttons_frame, text="Alerts", command=show_alerts, width=12, style="outline.TButton")
+    ttAlerts.pack(side=tk.LEFT, padx=10, pady=4)
+
+    # Add event handlers to save settings when changed
+    def on_setting_changed(*_):
+        save_settings()
+
+    format_var.trace_add('write', on_setting_changed)
+    quality_var.trace_add('write', on_setting_changed)
+    sidecars_var.trace_add('write', on_setting_changed)
+    hash_var.trace_add('write', on_setting_changed)
+    live_mode_var.trace_add('write', on_setting_changed)
+    live_split_var.trace_add('write', on_setting_changed)
+    fragments_var.trace_add('write', on_setting_changed)
+    library_var.trace_add('write', on_setting_changed)
+    download_path.trace_add('write', on_setting_changed)
+
+    # --- Settings persistence ---
+
+    def save_settings():
+        settings = {
+            'download_path': download_path.get(),
+            'format': format_var.get(),
+            'quality': quality_var.get(),
+            'sidecars': sidecars_var.get(),
+            'hash': hash_var.get(),
+            'live_mode': live_mode_var.get(),
+            'live_split': live_split_var.get(),
+            'fragments': fragments_var.get(),
+            'library': library_var.get()
+        }
+        try:
+            with open(SETTINGS_FILE, 'w') as f:
+                json.dump(settings, f)
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+
+    def load_settings():
+        try:
+            if os.path.exists(SETTINGS_FILE):
+                with open(SETTINGS_FILE, 'r') as f:
+                    settings = json.load(f)
+                download_path.set(settings.get('download_path', os.path.join(os.path.expanduser("~"), "Downloads")))
+                format_var.set(settings.get('format', "MP4 (Video + Audio)"))
+                quality_var.set(settings.get('quality', "1080p"))
+                sidecars_var.set(settings.get('sidecars', False))
+                if settings.get('hash') in HASH_CHOICES:
+                    hash_var.set(settings['hash'])
+                if settings.get('live_mode') in LIVE_MODES:
+                    live_mode_var.set(settings['live_mode'])
+                if settings.get('live_split') in LIVE_SPLITS:
+                    live_split_var.set(settings['live_split'])
+                if settings.get('fragments') in FRAGMENT_CHOICES:
+                    fragments_var.set(settings['fragments'])
+                if settings.get('library') in LIBRARY_LINK_MODES:
+                    library_var.set(settings['library'])
+        except Exception as e:
+            print(f"Error loading settings: {e}")
+
+    # Load settings before mainloop
+    load_settings()
+
+    # --- Tooltips ---
+    add_tooltip(url_entry, "Paste a YouTube or playlist URL here.")
+    add_tooltip(folder_entry, "Choose where to save your downloads.")
+    add_tooltip(format_menu, "Select the output format.")
+    add_tooltip(quality_menu, "Select the maximum video quality. (Disabled for audio-only downloads)")
+    add_tooltip(playlist_check, "Enable to download all videos in a playlist.")
+    add_tooltip(playlist_start_entry, "First video in playlist to download (optional).")
+    add_tooltip(playlist_end_entry, "Last video in playlist to download (optional).")
+    add_tooltip(filename_entry, "Custom filename (optional). For playlists, index is appended.")
+    add_tooltip(clip_entry, "Download only these time ranges (start-end). Separate several ranges with commas; leave the end out to go to the end.")
+    add_tooltip(exact_cuts_check, "Re-encode around the cuts so clips start and end exactly. Otherwise they start at the nearest earlier keyframe.")
+    add_tooltip(live_mode_menu, "For live streams and premieres: record from now, or keep only the last minutes until you press Cancel.")
+    add_tooltip(live_split_menu, "Start a new file after this much recording time or size.")
+    add_tooltip(fragments_menu, "How many HLS/DASH fragments to download at once. Auto adds fragments while it makes the download faster and backs off when the server throttles.")
+    add_tooltip(library_menu, "Keep one copy of each video in the download folder's .library and link it into playlist folders. Videos already there are linked without downloading.")
+    add_tooltip(hash_menu, "Checksum each file while it downloads and keep it in the history for Verify Files.")
+    add_tooltip(sidecars_check, "Embed cover art, English subtitles and chapters while merging (MP4 Video + Audio).")
+    add_tooltip(unified_btn, "Start downloading the video or playlist. When downloading, becomes Cancel.")
+    add_tooltip(ttQueue, "Queue another download. Single videos run before queued playlists.")
+    add_tooltip(ttHistory, "View download history.")
+    add_tooltip(ttAlerts, "Errors and warnings from running downloads, grouped by job.")
+
+    # --- Collecting Information Label (placed below buttons) ---
+    collecting_label = tk.Label(root, text="", font=("Segoe UI", 10, "italic"), fg=COLORS["status_info"], bg=COLORS["bg"])
+    collecting_label.grid(row=4, column=0, pady=(0, 2), sticky="n")
+    collecting_label.grid_remove()  # Hide initially
+
+    # --- Progress and status ---
+    progress_frame = tk.Frame(root, bg=COLORS["bg"])
+    progress_frame.grid(row=5, column=0, pady=5, sticky="ew")
+    progress_frame.grid_columnconfigure(0, weight=1)
+
+    # Progress bar
+    progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=450, mode="determinate")
+    progress_bar.grid(row=0, column=0, sticky="ew")
+
+    # Frame for speed and percent (side by side, below progress bar)
+    speed_percent_frame = tk.Frame(progress_frame, bg=COLORS["bg"])
+    speed_percent_frame.grid(row=1, column=0, sticky="ew", pady=(2, 0))
+    speed_percent_frame.grid_columnconfigure(0, weight=1)
+    speed_percent_frame.grid_columnconfigure(1, weight=0)
+
+    # Speed label (left, expands)
+    speed_label = tk.Label(speed_percent_frame, text="", font=("Segoe UI", 9), fg=COLORS["fg"], bg=COLORS["bg"])
+    speed_label.grid(row=0, column=0, sticky="w")
+    # Percent label (right, bold)
+    progress_label = tk.Label(speed_percent_frame, text="", font=("Segoe UI", 10, "bold"), fg=COLORS["fg"], bg=COLORS["bg"])
+    progress_label.grid(row=0, column=1, sticky="e", padx=(8, 0))
+
+    # Status label with icon
+    status_icon_label = tk.Label(root, text="", font=("Segoe UI", 13), bg=COLORS["bg"])
+    status_icon_label.grid(row=6, column=0, sticky="w", padx=20)
+    status_label = tk.Label(root, text="", font=("Segoe UI", 10), bg=COLORS["bg"], fg=COLORS["fg"])
+    status_label.grid(row=7, column=0, sticky="w", padx=50)
+
+
+def main():
+    global network_paths, scheduler, sidecar_fetcher, history_store
+    network_paths = NetworkPathPool.from_file()
+    scheduler = JobScheduler(run_download_job, host_caps=HOST_CONCURRENCY_CAPS, scale=network_paths.healthy_count)
+    sidecar_fetcher = SidecarFetcher()
+    history_store = HistoryStore()
+    build_main_window()
+    # Keep the unread count on the Alerts button current
+    update_alerts_button()
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1058 @@
+# --- Offline replay harness and throughput benchmarks ---
+# Runs the downloader's real download_task/progress_hook code without a
+# display or network: a local HTTP server serves synthetic progressive, HLS
+# and DASH media, a fake extractor points yt-dlp at it, and the app module is
+# imported without building its window; the Tk root and widgets are replaced
+# by headless stand-ins that count UI callbacks.
+#
+#   python offline_harness.py                 run every scenario and check thresholds
+#   python offline_harness.py progressive hls run only the named scenarios
+#                                             (slow ones marked opt_in only run this way)
+#   python offline_harness.py --no-check      report only, never fail
+#
+# The hls_paced_* and hls_429_* scenarios pace segments like a throttling CDN
+# and compare fixed fragment counts with the adaptive controller. Its
+# decisions are printed as [aimd] lines; --run-scenario NAME shows them,
+# along with the events the app logs.
+#
+# The history_search scenario instead fills a history database and times the
+# searches and page fetches the history window makes. The alerts_window
+# scenario publishes events from many jobs and times the Alerts window's
+# polls, with stand-ins for its Toplevel, Treeview and Text.
+#
+# The formats_* scenarios serve real media made with ffmpeg and check which
+# formats were fetched and what ended up in the file; they are skipped when
+# ffmpeg is not on PATH.
+
+# --- Standard Library Imports ---
+import os
+import sys
+import re
+import json
+import time
+import logging
+import types
+import random
+import shutil
+import tempfile
+import threading
+import importlib.util
+import subprocess
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Third-Party Imports ---
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Youtube_video_downloader.py")
+MB = 1024 * 1024
+
+# name -> job overrides plus what the local server should serve
+SCENARIOS = {
+    "progressive": {"url": "harness://progressive/clip", "size_mb": 64},
+    # Same clip, but metadata was prefetched when the URL was pasted
+    "progressive_prefetched": {"url": "harness://progressive/clip", "size_mb": 64, "prefetch": True},
+    "hls": {"url": "harness://hls/stream", "segments": 60, "segment_kb": 1024},
+    # Checksums computed while writing; the recorded digests are checked against the files
+    "progressive_sha256": {"url": "harness://progressive/clip", "size_mb": 64, "hash": "sha256"},
+    "hls_blake2b": {"url": "harness://hls/stream", "segments": 60, "segment_kb": 1024, "hash": "blake2b"},
+    "dash": {"url": "harness://dash/stream", "segments": 60, "segment_kb": 1024},
+    "playlist": {"url": "harness://playlist/mix", "entries": 20, "size_mb": 2, "is_playlist": True},
+    # Many short clips: per-entry setup cost dominates
+    "short_clips": {"url": "harness://playlist/shorts", "entries": 200, "size_mb": 0.25, "is_playlist": True},
+    # Many tiny entries with a realistic amount of per-entry format data:
+    # peak RSS must not grow with the number of entries. The default run checks
+    # a few hundred; the full channel is slow (about a minute per 1,000
+    # entries), so it only runs when named
+    "playlist_memory": {"url": "harness://playlist/uploads", "entries": 400, "size_mb": 0.004,
+                        "extra_formats": 60, "is_playlist": True},
+    "large_playlist": {"url": "harness://playlist/channel", "entries": 10000, "size_mb": 0.004,
+                       "extra_formats": 60, "is_playlist": True, "opt_in": True},
+    # Live recording in real time: split into parts by size, and a long run that
+    # only keeps the last seconds in the disk ring (RSS must stay flat)
+    "live": {"url": "harness://live/event", "segments": 40, "segment_kb": 512, "segment_ms": 250,
+             "live_split_mb": 4},
+    "live_rolling": {"url": "harness://live/rolling", "segments": 3000, "segment_kb": 64, "segment_ms": 20,
+                     "live_keep_s": 2},
+    # A CDN that caps every request at 1 MB/s on a 4 MB/s link: fixed fragment
+    # counts against the adaptive controller, which should settle at the knee (4)
+    "hls_paced_fixed": {"url": "harness://hls/paced", "segments": 48, "segment_kb": 1024, "fragments": "3 at a time",
+                        "connection_kbps": 1024, "link_kbps": 4096},
+    "hls_paced_fixed16": {"url": "harness://hls/paced", "segments": 48, "segment_kb": 1024,
+                          "fragments": "16 at a time", "connection_kbps": 1024, "link_kbps": 4096},
+    "hls_paced_auto": {"url": "harness://hls/paced", "segments": 48, "segment_kb": 1024, "fragments": "Auto",
+                       "connection_kbps": 1024, "link_kbps": 4096},
+    # Same, but the server answers 429 beyond 4 requests at once
+    "hls_429_fixed": {"url": "harness://hls/busy", "segments": 48, "segment_kb": 1024, "fragments": "8 at a time",
+                      "connection_kbps": 1024, "link_kbps": 4096, "max_in_flight": 4},
+    "hls_429_auto": {"url": "harness://hls/busy", "segments": 48, "segment_kb": 1024, "fragments": "Auto",
+                     "connection_kbps": 1024, "link_kbps": 4096, "max_in_flight": 4},
+    # yt-dlp retries a 503 itself instead of failing the fragment; the controller still backs off
+    "hls_503_auto": {"url": "harness://hls/busy", "segments": 48, "segment_kb": 1024, "fragments": "Auto",
+                     "connection_kbps": 1024, "link_kbps": 4096, "max_in_flight": 4, "throttle_status": 503},
+    # Four 16 MB downloads from a server that allows 4 MB/s per client address:
+    # one network path against four source addresses, and four with one blocked
+    "paths_single": {"url": "harness://progressive/clip", "size_mb": 16, "jobs": 4, "address_kbps": 4096,
+                     "paths": ["127.0.0.1"]},
+    "paths_four": {"url": "harness://progressive/clip", "size_mb": 16, "jobs": 4, "address_kbps": 4096,
+                   "paths": ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.4"]},
+    "paths_blocked": {"url": "harness://progressive/clip", "size_mb": 16, "jobs": 4, "address_kbps": 4096,
+                      "paths": ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.4"],
+                      "blocked_addresses": ["127.0.0.3"]},
+    # Two playlists with the same 10 entries, one after the other, stored in
+    # the library: the second is linked from it without any media requests
+    "library_playlists": {"url": "harness://playlist/mix", "entries": 10, "size_mb": 2, "is_playlist": True,
+                          "entry_prefix": "shared", "playlists": 2, "library": "Hard links"},
+    # Search, filter and scroll through a large history database
+    "history_search": {"history_records": 100000},
+    # Many jobs reporting warnings (with repeats) and errors to an open Alerts window
+    "alerts_window": {"alert_jobs": 200, "alert_events": 20000},
+    # Real media offered as several video-only, audio-only and muxed formats:
+    # the chosen format and quality decide what is fetched and merged
+    "formats_720p": {"url": "harness://media/clip", "media": True, "quality": "720p",
+                     "expect_formats": ["v720", "a128"], "expect_streams": ["Video: h264", "Audio: aac"]},
+    "formats_video_only": {"url": "harness://media/clip", "media": True, "format": "MP4 (Video Only)",
+                           "expect_formats": ["v1080"], "expect_streams": ["Video: h264"]},
+    "formats_mp3": {"url": "harness://media/clip", "media": True, "format": "MP3 (Audio Only)",
+                    "expect_formats": ["a128"], "expect_streams": ["Audio: mp3"]},
+    # A merged download is hashed while ffmpeg writes it; its formats are not
+    "formats_sha256": {"url": "harness://media/clip", "media": True, "quality": "720p", "hash": "sha256",
+                       "expect_formats": ["v720", "a128"], "expect_streams": ["Video: h264", "Audio: aac"]},
+    # Thumbnail, subtitles and chapters go into the same merge (MP4 also
+    # keeps the chapters as a text track, the Data stream)
+    "formats_sidecars": {"url": "harness://media/clip", "media": True, "quality": "720p", "sidecars": True,
+                         "expect_formats": ["v720", "a128"], "expect_chapters": 2,
+                         "expect_streams": ["Video: h264", "Audio: aac", "Video: mjpeg (attached pic)",
+                                            "Subtitle: mov_text", "Data: bin_data"]},
+    # Each clip range becomes its own file named after the range; without a
+    # known duration the open-ended range is named "end"
+    "formats_clip": {"url": "harness://media/clip", "media": True, "quality": "720p", "clip": "0:02-0:04, 0:08-",
+                     "no_duration": True, "expect_formats": ["v720", "a128"],
+                     "expect_clips": {"[00-00-02-00-00-04]": 2.0, "[00-00-08-end]": 2.0}},
+}
+
+# Defaults apply to every scenario; per-scenario entries override them.
+# A run fails if any measured value falls on the wrong side of its limit.
+THRESHOLDS = {
+    "default": {
+        "min_mb_per_s": 10.0,
+        "max_ttfb_s": 2.0,
+        "max_cpu_s_per_mb": 0.05,
+        "max_peak_rss_mb": 250.0,
+        "max_callbacks_per_mb": 60.0,
+    },
+    "playlist": {"max_ttfb_s": 3.0},
+    # Fragment files are created, truncated and removed per segment; on slow
+    # filesystems that, not the transport, bounds HLS/DASH throughput.
+    "hls": {"min_mb_per_s": 5.0},
+    "hls_blake2b": {"min_mb_per_s": 5.0},
+    "dash": {"min_mb_per_s": 5.0},
+    # Every clip pays a fixed number of label updates regardless of its size.
+    "short_clips": {"max_callbacks_per_mb": 150.0},
+    # Live runs are paced by the stream, not the transport
+    "live": {"min_mb_per_s": None, "max_ttfb_s": None},
+    "live_rolling": {"min_mb_per_s": None, "max_ttfb_s": None, "max_cpu_s_per_mb": None,
+                     "max_peak_rss_mb": 120.0},
+    # Paced by the synthetic link; the fixed counts are the baselines to compare against
+    "hls_paced_fixed": {"min_mb_per_s": None},
+    "hls_paced_fixed16": {"min_mb_per_s": None},
+    "hls_paced_auto": {"min_mb_per_s": 3.3},
+    "hls_429_fixed": {"min_mb_per_s": None},
+    "hls_429_auto": {"min_mb_per_s": 2.2, "max_http_429": 5},
+    "hls_503_auto": {"min_mb_per_s": 2.2, "max_http_429": 5},
+    # Bound by the per-address limit: 4 MB/s per path in use
+    "paths_single": {"min_mb_per_s": None},
+    "paths_four": {"min_mb_per_s": 12.0},
+    # One path carries two of the jobs after the failover
+    "paths_blocked": {"min_mb_per_s": 7.0},
+    # Every search (count plus first page) and every page fetched while scrolling
+    "history_search": {"max_query_ms": 50.0},
+    "alerts_window": {"max_query_ms": 100.0},
+    # Keeping every entry costs about 50 MB over the baseline at 400 entries
+    "playlist_memory": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None,
+                        "max_peak_rss_mb": 75.0},
+    "large_playlist": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None,
+                       "max_peak_rss_mb": 120.0},
+    # A few hundred KB each, and most of the time goes to ffmpeg
+    "formats_720p": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+    "formats_video_only": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+    "formats_mp3": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+    "formats_sha256": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+    "formats_sidecars": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+    "formats_clip": {"min_mb_per_s": None, "max_cpu_s_per_mb": None, "max_callbacks_per_mb": None},
+}
+
+
+# --- Synthetic media server ---
+def synthetic_bytes(size, offset=0):
+    """Deterministic filler; offset lets a range be built without the whole file."""
+    pattern = bytes(range(256))
+    start = offset % 256
+    return (pattern * ((start + size) // 256 + 1))[start:start + size]
+
+
+def make_media(directory, seconds=10):
+    """Encode a short test clip as separate video and audio files, a muxed file and a thumbnail."""
+    os.makedirs(directory, exist_ok=True)
+    video = ['-f', 'lavfi', '-i', f'testsrc=size=320x180:rate=25:duration={seconds}']
+    audio = ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}']
+    # A keyframe every second, so clips can be cut without re-encoding
+    h264 = ['-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-g', '25']
+    outputs = {
+        'video.mp4': video + h264 + ['-an'],
+        'audio.m4a': audio + ['-c:a', 'aac', '-vn'],
+        'muxed.mp4': video + audio + h264 + ['-c:a', 'aac', '-shortest'],
+        'thumb.jpg': video + ['-frames:v', '1'],
+    }
+    for name, args in outputs.items():
+        subprocess.run(['ffmpeg', '-v', 'error', '-y', *args, os.path.join(directory, name)], check=True)
+    with open(os.path.join(directory, 'subs.vtt'), 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n00:00:00.500 --> 00:00:03.000\nHarness subtitle\n")
+
+
+def probe_media(path):
+    """Streams ffmpeg finds in a file, as 'Video: h264', 'Audio: aac', ..., its number of chapters and its duration."""
+    proc = subprocess.run(['ffmpeg', '-hide_banner', '-i', path], capture_output=True, text=True)
+    streams = []
+    for line in proc.stderr.splitlines():
+        match = re.search(r'Stream #\d+:\d+.*?: (Video|Audio|Subtitle|Data): (\w+)', line)
+        if match:
+            streams.append(f'{match.group(1)}: {match.group(2)}' + (' (attached pic)' if 'attached pic' in line else ''))
+    match = re.search(r'Duration: (\d+):(\d+):([\d.]+)', proc.stderr)
+    duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3)) if match else None
+    return streams, len(re.findall(r'Chapter #\d+:\d+', proc.stderr)), duration
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves /progressive/<size>/<id>.mp4 (with Range), /hls/.../index.m3u8 with
+    segN.ts, /dash/<id>/segN.m4s and a sliding-window live playlist under
+    /live/. Sizes are encoded in the URLs the fake extractor hands out; the
+    only state is when each live stream was first requested. Files made by
+    make_media() are served from /media/<format_id>/<file>, and which
+    format_ids were fetched is logged; its thumbnail and subtitles are under
+    /sidecar/."""
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    live_started = {}
+    live_window_ms = 6000  # like real playlists, several target durations long
+    # Pacing, like a CDN: bytes/s per request, per client address and for the
+    # whole link, and how many segment requests may run before the server
+    # answers 429. Blocked client addresses get 403 for everything.
+    connection_rate = 0
+    address_rate = 0
+    link_rate = 0
+    max_in_flight = 0
+    throttle_status = 429
+    blocked_addresses = ()
+    media_dir = None
+    media_requests = []
+    served_bytes = 0
+    in_flight = 0
+    throttled = 0
+    link_free = 0.0
+    address_free = {}
+    pacing_lock = threading.Lock()
+
+    def log_message(self, *_):
+        pass
+
+    def _send(self, body, content_type, status=200, extra_headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            with MediaHandler.pacing_lock:
+                MediaHandler.served_bytes += len(body)
+            self._write(body)
+
+    def _write(self, body, chunk=64 * 1024):
+        cls = MediaHandler
+        if not (cls.connection_rate or cls.address_rate or cls.link_rate):
+            return self.wfile.write(body)
+        address = self.client_address[0]
+        started = time.monotonic()
+        for offset in range(0, len(body), chunk):
+            part = body[offset:offset + chunk]
+            due = started + (offset + len(part)) / cls.connection_rate if cls.connection_rate else 0
+            # The link and each address send one chunk at a time, in arrival order
+            with cls.pacing_lock:
+                if cls.address_rate:
+                    free = max(cls.address_free.get(address, 0.0), time.monotonic()) + len(part) / cls.address_rate
+                    cls.address_free[address] = free
+                    due = max(due, free)
+                if cls.link_rate:
+                    cls.link_free = max(cls.link_free, time.monotonic()) + len(part) / cls.link_rate
+                    due = max(due, cls.link_free)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.wfile.write(part)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.client_address[0] in self.blocked_addresses:
+            return self._send(b'blocked', 'text/plain', status=403)
+        if self.path == '/health':
+            return self._send(b'', 'text/plain', status=204)
+        if self.path.startswith('/live/') and self.headers.get('X-Harness-Token') != 'live':
+            # The fake live format carries this header, as signed streams carry cookies
+            return self._send(b'missing format headers', 'text/plain', status=403)
+        match = re.match(r'^/progressive/(\d+)/[\w-]+\.mp4$', self.path)
+        if match:
+            return self._send_range(int(match.group(1)), 'video/mp4')
+        match = re.match(r'^/media/([\w-]+)/([\w-]+\.\w+)$', self.path)
+        if match and self.media_dir:
+            if self.command == 'GET':
+                self.media_requests.append(match.group(1))
+            with open(os.path.join(self.media_dir, match.group(2)), 'rb') as f:
+                body = f.read()
+            return self._send_range(len(body), 'application/octet-stream', body)
+        match = re.match(r'^/sidecar/(thumb\.jpg|subs\.vtt)$', self.path)
+        if match and self.media_dir:
+            with open(os.path.join(self.media_dir, match.group(1)), 'rb') as f:
+                return self._send(f.read(), 'application/octet-stream')
+        match = re.match(r'^/hls/(\d+)/(\d+)/[\w-]+/index\.m3u8$', self.path)
+        if match:
+            segments, segment_size = int(match.group(1)), int(match.group(2))
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0']
+            for i in range(segments):
+                lines += ['#EXTINF:4.0,', f'seg{i}.ts?size={segment_size}']
+            lines.append('#EXT-X-ENDLIST')
+            return self._send(('\n'.join(lines) + '\n').encode(), 'application/vnd.apple.mpegurl')
+        match = re.match(r'^/live/(\d+)/(\d+)/(\d+)/([\w-]+)/index\.m3u8$', self.path)
+        if match:
+            segments, segment_size, segment_ms = (int(group) for group in match.group(1, 2, 3))
+            started = self.live_started.setdefault(match.group(4), time.monotonic())
+            available = min(segments, int((time.monotonic() - started) * 1000 / segment_ms) + 1)
+            first = max(0, available - max(3, self.live_window_ms // segment_ms))
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{max(1, round(segment_ms / 1000))}',
+                     f'#EXT-X-MEDIA-SEQUENCE:{first}']
+            for i in range(first, available):
+                lines += [f'#EXTINF:{segment_ms / 1000:.3f},', f'seg{i}.ts?size={segment_size}']
+            if available == segments:
+                lines.append('#EXT-X-ENDLIST')
+            return self._send(('\n'.join(lines) + '\n').encode(), 'application/vnd.apple.mpegurl')
+        match = re.match(r'^/(?:hls|dash|live)/.*seg\d+\.(?:ts|m4s)\?size=(\d+)$', self.path)
+        if match:
+            if self.max_in_flight:
+                return self._send_limited(synthetic_bytes(int(match.group(1))), 'video/mp2t')
+            return self._send(synthetic_bytes(int(match.group(1))), 'video/mp2t')
+        self._send(b'not found', 'text/plain', status=404)
+
+    def _send_limited(self, body, content_type):
+        cls = MediaHandler
+        with cls.pacing_lock:
+            overloaded = cls.in_flight >= cls.max_in_flight
+            if overloaded:
+                cls.throttled += 1
+            else:
+                cls.in_flight += 1
+        if overloaded:
+            return self._send(b'slow down', 'text/plain', status=cls.throttle_status)
+        try:
+            self._send(body, content_type)
+        finally:
+            with cls.pacing_lock:
+                cls.in_flight -= 1
+
+    def _send_range(self, size, content_type, body=None):
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if not match:
+            return self._send(synthetic_bytes(size) if body is None else body, content_type)
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else size - 1
+        end = min(end, size - 1)
+        part = synthetic_bytes(end - start + 1, start) if body is None else body[start:end + 1]
+        self._send(part, content_type, status=206, extra_headers={'Content-Range': f'bytes {start}-{end}/{size}'})
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+# --- Fake extractor ---
+class FakeMediaIE(InfoExtractor):
+    """Turns harness://<kind>/<id> URLs into formats served by the local server."""
+    IE_NAME = 'harness'
+    _VALID_URL = r'harness://(?P<kind>progressive|hls|dash|live|playlist|media)/(?P<id>[\w-]+)'
+    BASE_URL = None
+    SCENARIO = {}
+
+    def _real_extract(self, url):
+        kind, video_id = re.match(self._VALID_URL, url).group('kind', 'id')
+        scenario = self.SCENARIO
+        if kind == 'playlist':
+            # A generator, like a paged channel listing
+            # Playlists with the same entry_prefix share their entries
+            prefix = scenario.get('entry_prefix', video_id)
+            entries = (self.url_result(f'harness://progressive/{prefix}-{i}', FakeMediaIE.ie_key(), f'{prefix}-{i}',
+                                       f'Harness progressive {prefix}-{i}')
+                       for i in range(1, scenario.get('entries', 10) + 1))
+            return self.playlist_result(entries, video_id, f'Harness playlist {video_id}')
+
+        info = {'id': video_id, 'title': f'Harness {kind} {video_id}', 'duration': 240}
+        if kind == 'media':
+            info['duration'] = None if scenario.get('no_duration') else 10
+            return {**info, 'formats': self._media_formats(),
+                    'thumbnails': [{'url': f'{self.BASE_URL}/sidecar/thumb.jpg', 'id': '0'}],
+                    'subtitles': {'en': [{'url': f'{self.BASE_URL}/sidecar/subs.vtt', 'ext': 'vtt'}]},
+                    'chapters': [{'start_time': 0, 'end_time': 4, 'title': 'Intro'},
+                                 {'start_time': 4, 'end_time': 10, 'title': 'Main'}]}
+        fmt = {'format_id': kind, 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'mp4a.40.2', 'height': 720}
+        if kind == 'progressive':
+            size = int(scenario.get('size_mb', 16) * MB)
+            fmt.update(url=f'{self.BASE_URL}/progressive/{size}/{video_id}.mp4', protocol='http', filesize=size)
+        elif kind == 'live':
+            segments, segment_size = scenario.get('segments', 30), scenario.get('segment_kb', 512) * 1024
+            segment_ms = scenario.get('segment_ms', 1000)
+            info.update(is_live=True, live_status='is_live')
+            fmt.update(url=f'{self.BASE_URL}/live/{segments}/{segment_size}/{segment_ms}/{video_id}/index.m3u8',
+                       protocol='m3u8_native', http_headers={'X-Harness-Token': 'live'})
+        elif kind == 'hls':
+            segments, segment_size = scenario.get('segments', 30), scenario.get('segment_kb', 512) * 1024
+            fmt.update(url=f'{self.BASE_URL}/hls/{segments}/{segment_size}/{video_id}/index.m3u8',
+                       protocol='m3u8_native', filesize_approx=segments * segment_size)
+        else:
+            segments, segment_size = scenario.get('segments', 30), scenario.get('segment_kb', 512) * 1024
+            fmt.update(url=f'{self.BASE_URL}/dash/{video_id}/manifest.mpd', protocol='http_dash_segments',
+                       fragment_base_url=f'{self.BASE_URL}/dash/{video_id}/',
+                       fragments=[{'path': f'seg{i}.m4s?size={segment_size}', 'duration': 4.0}
+                                  for i in range(segments)],
+                       filesize_approx=segments * segment_size)
+        # Lower-quality decoys that make each entry's info dict as heavy as a real one
+        # (with strings of its own, as a real one has, so a leaked entry costs memory)
+        decoys = [{'format_id': f'decoy{i}', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a', 'height': 144,
+                   'url': f'{self.BASE_URL}/missing/{video_id}/{i}',
+                   'http_headers': {'X-Pad': f'{video_id}/{i}/' + 'x' * 256}}
+                  for i in range(scenario.get('extra_formats', 0))]
+        info['formats'] = decoys + [fmt]
+        info['thumbnails'] = [{'url': f'{self.BASE_URL}/thumb/{video_id}/{i}.jpg', 'id': str(i)} for i in range(20)]
+        return info
+
+    def _media_formats(self):
+        """The make_media() files as a site lists them: video-only in several
+        heights and codecs, audio-only in two bitrates, and a low muxed one.
+        The codecs are what the site claims; the bytes are the same clip."""
+        base = f'{self.BASE_URL}/media'
+        video = {'ext': 'mp4', 'acodec': 'none', 'protocol': 'http'}
+        audio = {'ext': 'm4a', 'vcodec': 'none', 'protocol': 'http'}
+        return [
+            {'format_id': 'muxed360', 'url': f'{base}/muxed360/muxed.mp4', 'ext': 'mp4', 'protocol': 'http',
+             'vcodec': 'avc1.4d401e', 'acodec': 'mp4a.40.2', 'width': 640, 'height': 360, 'tbr': 800},
+            {**audio, 'format_id': 'a48', 'url': f'{base}/a48/audio.m4a', 'acodec': 'mp4a.40.5', 'abr': 48},
+            {**audio, 'format_id': 'a128', 'url': f'{base}/a128/audio.m4a', 'acodec': 'mp4a.40.2', 'abr': 128},
+            {**video, 'format_id': 'v720', 'url': f'{base}/v720/video.mp4', 'vcodec': 'h264',
+             'width': 1280, 'height': 720, 'tbr': 2000},
+            # Higher bitrates at the same height: AV1 ranks after H.264, and
+            # VP9 cannot be copied into MP4 at all
+            {**video, 'format_id': 'v720av1', 'url': f'{base}/v720av1/video.mp4', 'vcodec': 'av01.0.05M.08',
+             'width': 1280, 'height': 720, 'tbr': 2200},
+            {**video, 'format_id': 'v720vp9', 'url': f'{base}/v720vp9/video.mp4', 'ext': 'webm',
+             'vcodec': 'vp09.00.40.08', 'width': 1280, 'height': 720, 'tbr': 2500},
+            {**video, 'format_id': 'v1080', 'url': f'{base}/v1080/video.mp4', 'vcodec': 'avc1.640028',
+             'width': 1920, 'height': 1080, 'tbr': 4000},
+        ]
+
+
+class HarnessYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that knows the fake extractor and reports bytes to the metrics."""
+    metrics = None
+
+    def __init__(self, params=None, auto_init=True):
+        # The synthetic bytes are not real media, so skip ffmpeg fixups
+        super().__init__({**(params or {}), 'fixup': 'never'}, auto_init)
+        if self.metrics is not None:
+            self.add_progress_hook(self.metrics.progress_hook)
+
+    def add_default_info_extractors(self):
+        self.add_info_extractor(FakeMediaIE())
+        super().add_default_info_extractors()
+
+
+# --- Headless stand-ins for the Tk root and widgets ---
+class HeadlessWidget:
+    """Accepts any widget call; remembers config() values so cget() works."""
+
+    def __init__(self):
+        self._options = {}
+
+    def config(self, **kwargs):
+        self._options.update(kwargs)
+
+    configure = config
+
+    def cget(self, key):
+        return self._options.get(key, "")
+
+    def __getattr__(self, _name):
+        return lambda *args, **kwargs: None
+
+
+class HeadlessRoot(HeadlessWidget):
+    """Counts root.after() calls, which is what every UI update from a worker costs."""
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = 0
+        self._lock = threading.Lock()
+
+    def after(self, _ms, _func=None, *_args):
+        with self._lock:
+            self.callbacks += 1
+
+
+class HeadlessToplevel(HeadlessWidget):
+    """A window whose after() callbacks wait until pump() runs them."""
+
+    def __init__(self):
+        super().__init__()
+        self.exists = True
+        self.pending = []
+
+    def after(self, _ms, func=None, *args):
+        self.pending.append((func, args))
+
+    def pump(self):
+        pending, self.pending = self.pending, []
+        for func, args in pending:
+            func(*args)
+
+    def winfo_exists(self):
+        return self.exists
+
+    def destroy(self):
+        self.exists = False
+
+
+class HeadlessTree(HeadlessWidget):
+    """A Treeview that keeps its rows: iid -> insert()/item() options plus the parent."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = {}
+
+    def insert(self, parent, _index, iid=None, **options):
+        self.rows[iid] = {'parent': parent, **options}
+        return iid
+
+    def exists(self, iid):
+        return iid in self.rows
+
+    def item(self, iid, **options):
+        self.rows[iid].update(options)
+
+    def get_children(self, item=''):
+        return [iid for iid, row in self.rows.items() if row['parent'] == item]
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.delete(*self.get_children(iid))
+            self.rows.pop(iid, None)
+
+    def selection(self):
+        return ()
+
+
+class HeadlessText(HeadlessWidget):
+    def __init__(self):
+        super().__init__()
+        self.text = ""
+
+    def insert(self, _index, text):
+        self.text += text
+
+    def delete(self, *_indexes):
+        self.text = ""
+
+    def get(self, *_indexes):
+        return self.text
+
+
+class HeadlessTk(HeadlessWidget):
+    """tk and ttk for windows a scenario opens: every widget is a stand-in,
+    and the windows, trees and button commands are kept for the scenario."""
+
+    def __init__(self):
+        super().__init__()
+        self.windows = []
+        self.trees = []
+        self.buttons = {}
+
+    def Toplevel(self, *_args, **_kwargs):
+        self.windows.append(HeadlessToplevel())
+        return self.windows[-1]
+
+    def Treeview(self, *_args, **_kwargs):
+        self.trees.append(HeadlessTree())
+        return self.trees[-1]
+
+    def Text(self, *_args, **_kwargs):
+        return HeadlessText()
+
+    def Button(self, *_args, text=None, command=None, **_kwargs):
+        self.buttons[text] = command
+        return HeadlessWidget()
+
+    def __getattr__(self, _name):
+        return lambda *args, **kwargs: HeadlessWidget()
+
+
+class HeadlessMessagebox:
+    def __init__(self):
+        self.messages = []
+
+    def _record(self, kind):
+        def show(title, message, **_):
+            self.messages.append((kind, title, message))
+            print(f"[{kind}] {title}: {message}")
+        return show
+
+    def __getattr__(self, name):
+        return self._record(name)
+
+
+def load_app(root, messagebox):
+    """Import the app without building its window and swap in headless stand-ins."""
+    spec = importlib.util.spec_from_file_location('youtube_video_downloader_headless', APP_FILE)
+    module = importlib.util.module_from_spec(spec)
+    # PooledYoutubeDL subclasses yt_dlp.YoutubeDL at import time
+    real_youtube_dl = yt_dlp.YoutubeDL
+    yt_dlp.YoutubeDL = HarnessYoutubeDL
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        yt_dlp.YoutubeDL = real_youtube_dl
+    app = vars(module)
+    app['yt_dlp'] = types.SimpleNamespace(YoutubeDL=HarnessYoutubeDL)
+    app['messagebox'] = messagebox
+    app['tk'] = app['ttk'] = app['filedialog'] = HeadlessWidget()
+    app['root'] = root
+    # Widgets build_main_window would create
+    for name in ('status_icon_label', 'status_label', 'progress_bar', 'progress_label', 'speed_label',
+                 'collecting_label', 'unified_btn', 'prefetch_label'):
+        app[name] = HeadlessWidget()
+    app['extract_ffmpeg'] = lambda: shutil.which('ffmpeg') or 'ffmpeg'
+    return app
+
+
+# --- Metrics ---
+class Metrics:
+    def __init__(self):
+        self.started = None
+        self.first_byte = None
+        self.bytes = {}
+        self.lock = threading.Lock()
+
+    def progress_hook(self, d):
+        if d.get('status') not in ('downloading', 'finished'):
+            return
+        downloaded = d.get('downloaded_bytes') or 0
+        with self.lock:
+            if self.first_byte is None and downloaded:
+                self.first_byte = time.perf_counter()
+            key = d.get('filename')
+            self.bytes[key] = max(self.bytes.get(key, 0), downloaded)
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes.values())
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def run_scenario(name):
+    """Run one scenario in this process and return its measurements."""
+    scenario = SCENARIOS[name]
+    if 'history_records' in scenario:
+        return run_history_search(name, scenario)
+    if 'alert_jobs' in scenario:
+        return run_alerts_window(name, scenario)
+    if scenario.get('media') and not shutil.which('ffmpeg'):
+        return {'scenario': name, 'ok': True, 'skipped': "ffmpeg not found"}
+    server, base_url = start_server()
+    FakeMediaIE.BASE_URL = base_url
+    FakeMediaIE.SCENARIO = scenario
+    metrics = Metrics()
+    HarnessYoutubeDL.metrics = metrics
+    root = HeadlessRoot()
+    messagebox = HeadlessMessagebox()
+    app = load_app(root, messagebox)
+
+    work_dir = tempfile.mkdtemp(prefix='yt_harness_')
+    os.chdir(work_dir)
+    if scenario.get('media'):
+        # Outside the download folder, so only downloaded files are there
+        MediaHandler.media_dir = tempfile.mkdtemp(prefix='yt_harness_media_')
+        make_media(MediaHandler.media_dir)
+    job = {
+        'url': scenario['url'],
+        'folder': work_dir,
+        'format': scenario.get('format', "MP4 (Video + Audio)"),
+        'quality': scenario.get('quality', "1080p"),
+        'custom_name': "",
+        'is_playlist': scenario.get('is_playlist', False),
+        'playlist_start': "",
+        'playlist_end': "",
+        'priority': app['PRIORITY_BULK'] if scenario.get('is_playlist') else app['PRIORITY_INTERACTIVE'],
+        'sidecars': scenario.get('sidecars', False),
+        'clip': scenario.get('clip', ""),
+        'exact_cuts': False,
+        'hash': scenario.get('hash'),
+        'live_mode': "Record from now",
+        'live_split': "Don't split",
+        'fragments': scenario.get('fragments', "Auto"),
+        'library': scenario.get('library', "Off"),
+    }
+    if scenario.get('live_keep_s'):
+        job['live_mode'] = "harness"
+        app['LIVE_MODES']["harness"] = scenario['live_keep_s']
+    if scenario.get('live_split_mb'):
+        job['live_split'] = "harness"
+        app['LIVE_SPLITS']["harness"] = ('size', scenario['live_split_mb'] * MB)
+    MediaHandler.connection_rate = scenario.get('connection_kbps', 0) * 1024
+    MediaHandler.link_rate = scenario.get('link_kbps', 0) * 1024
+    MediaHandler.max_in_flight = scenario.get('max_in_flight', 0)
+    MediaHandler.throttle_status = scenario.get('throttle_status', 429)
+    MediaHandler.address_rate = scenario.get('address_kbps', 0) * 1024
+    MediaHandler.blocked_addresses = tuple(scenario.get('blocked_addresses', ()))
+    network_paths = app['network_paths'] = app['NetworkPathPool'](
+        [{'source_address': address} for address in scenario['paths']] if scenario.get('paths') else None,
+        health_url=f'{base_url}/health')
+    # Keep the adaptive controllers the job creates, for their decisions
+    controllers = []
+    controller_class = app['FragmentConcurrency']
+    app['FragmentConcurrency'] = lambda: controllers.append(controller_class()) or controllers[-1]
+    scheduler = app['scheduler'] = app['JobScheduler'](app['run_download_job'], scale=network_paths.healthy_count)
+    app['history_store'] = app['HistoryStore'](os.path.join(work_dir, 'download_history.db'), legacy_file=None)
+    app['sidecar_fetcher'] = app['SidecarFetcher'](cache_dir=os.path.join(work_dir, 'sidecar_cache'))
+
+    if scenario.get('prefetch'):
+        # What pasting the URL does, finished before the user clicks Download
+        key = (job['url'], job['is_playlist'])
+        done, cancel = threading.Event(), threading.Event()
+        app['prefetch_state'].update(key=key, generation=1, done=done, cancel=cancel, info=None, time=time.time())
+        app['prefetch_task'](key, 1, done, cancel)
+
+    # Files the app reads back to hash them; downloads and MP4 merges are hashed as they are written
+    read_back = []
+    read_file = app['update_hash_from_file']
+    app['update_hash_from_file'] = lambda hasher, path: read_back.append(path) or read_file(hasher, path)
+
+    cpu_before = time.process_time()
+    metrics.started = time.perf_counter()
+    # Copies are made before submit() gives the job its id and events
+    template = dict(job)
+    scheduler.submit(job)
+    for i in range(1, scenario.get('jobs', 1)):
+        scheduler.submit({**template, 'url': f"{job['url']}-{i}"})
+    for i in range(1, scenario.get('playlists', 1)):
+        # One after the other, so the later ones can use what the first stored
+        while scheduler.has_work():
+            time.sleep(0.01)
+        scheduler.submit({**template, 'url': f"{job['url']}-{i}"})
+    while scheduler.has_work():
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - metrics.started
+    cpu = time.process_time() - cpu_before
+    server.shutdown()
+    app['update_hash_from_file'] = read_file
+    for controller in controllers:
+        for when, old, new, reason, rate in controller.decisions:
+            kind = "workers" if reason == "workers" else "fragments"
+            measured = f", {app['format_size'](rate)}/s, {app['format_size'](rate / old)}/s per fragment" if rate else ""
+            print(f"[aimd] {when - metrics.started:7.2f}s {kind} {old} -> {new} ({reason}{measured})")
+
+    if scenario.get('segment_ms'):
+        # The recorder writes its own files; count what ended up on disk
+        recorded = sum(os.path.getsize(os.path.join(work_dir, f)) for f in os.listdir(work_dir)
+                       if f.endswith(('.ts', '.mp4')))
+        metrics.bytes = {'recorded': recorded}
+    total_mb = metrics.total_bytes / MB
+    errors = [event for event in app['event_bus'].changed_since(0) if event['level'] == 'error']
+    ok = total_mb > 0 and not errors and not any(kind == 'showerror' for kind, *_ in messagebox.messages)
+    if scenario.get('segment_ms'):
+        segment_size = scenario['segment_kb'] * 1024
+        if scenario.get('live_keep_s'):
+            # Only the last few seconds (plus a segment of slack) are kept
+            kept = scenario['live_keep_s'] * 1000 // scenario['segment_ms'] + 1
+            ok = ok and metrics.total_bytes <= kept * segment_size
+        else:
+            ok = ok and metrics.total_bytes == scenario['segments'] * segment_size
+    if scenario.get('connection_kbps'):
+        # Fragments given up on after too many 429s are missing from the output
+        written = sum(os.path.getsize(os.path.join(work_dir, f)) for f in os.listdir(work_dir) if f.endswith('.mp4'))
+        ok = ok and written == scenario['segments'] * scenario['segment_kb'] * 1024
+    if scenario.get('jobs'):
+        # The error a failover recovers from is still reported; what counts is that every job finished
+        ok = metrics.total_bytes == scenario['jobs'] * int(scenario['size_mb'] * MB)
+    if scenario.get('playlists'):
+        # Every playlist folder is complete, each file is a link into the library,
+        # and only the first playlist's media was fetched
+        entry_size = int(scenario['size_mb'] * MB)
+        library_dir = os.path.join(work_dir, app['LIBRARY_DIR'])
+        stored = [os.path.join(d, f) for d, _, files in os.walk(library_dir) for f in files]
+        linked = [os.path.join(work_dir, d, f) for d in os.listdir(work_dir) if d != app['LIBRARY_DIR']
+                  and os.path.isdir(os.path.join(work_dir, d)) for f in os.listdir(os.path.join(work_dir, d))]
+        ok = (ok and len(stored) == scenario['entries']
+              and len(linked) == scenario['entries'] * scenario['playlists']
+              and all(any(os.path.samefile(path, s) for s in stored) for path in linked)
+              and MediaHandler.served_bytes < (scenario['entries'] + 1) * entry_size)
+    if scenario.get('expect_formats'):
+        # Exactly the selected formats were fetched
+        outputs = [f for f in os.listdir(work_dir) if os.path.isfile(f) and not f.endswith('.db')]
+        ok = ok and sorted(set(MediaHandler.media_requests)) == sorted(scenario['expect_formats'])
+    if scenario.get('expect_streams'):
+        # One file, holding what the formats carry
+        streams, chapters, _ = probe_media(outputs[0]) if len(outputs) == 1 else ([], 0, None)
+        ok = (ok and len(outputs) == 1 and sorted(streams) == sorted(scenario['expect_streams'])
+              and chapters == scenario.get('expect_chapters', 0))
+    if scenario.get('expect_clips'):
+        # One file per range, named after it and about as long as it (cuts land on keyframes)
+        clips = {label: [f for f in outputs if os.path.splitext(f)[0].endswith(label)]
+                 for label in scenario['expect_clips']}
+        ok = ok and len(outputs) == len(clips) and all(
+            len(found) == 1 and abs(probe_media(found[0])[2] - seconds) < 0.5
+            for (label, found), seconds in zip(clips.items(), scenario['expect_clips'].values()))
+    if scenario.get('hash'):
+        files = app['history_store'].files()
+        ok = ok and bool(files) and not read_back and all(
+            f['digest'] == app['hash_file'](f['path'], f['algorithm']) for f in files)
+    return {
+        'scenario': name,
+        'ok': ok,
+        'mb': round(total_mb, 2),
+        'seconds': round(elapsed, 3),
+        'mb_per_s': round(total_mb / elapsed, 2) if elapsed else 0.0,
+        'ttfb_s': round(metrics.first_byte - metrics.started, 3) if metrics.first_byte else None,
+        'cpu_s': round(cpu, 3),
+        'cpu_s_per_mb': round(cpu / total_mb, 4) if total_mb else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource else None,
+        'tk_callbacks': root.callbacks,
+        'alerts': len(errors),
+        'callbacks_per_mb': round(root.callbacks / total_mb, 1) if total_mb else None,
+        'http_429': MediaHandler.throttled,
+        'fragments': controllers[-1].limit if controllers else None,
+        'fragment_decisions': sum(len(c.decisions) for c in controllers),
+        'served_mb': round(MediaHandler.served_bytes / MB, 2),
+        'paths_ejected': [path['name'] for path in network_paths.paths if path['ejected_until']],
+        'hash_reads': len(read_back),
+        'merges': [event['message'] for event in app['event_bus'].changed_since(0) if event['title'] == "Merged"],
+    }
+
+
+def run_history_search(name, scenario):
+    """Fill a history database and time the queries the history window makes."""
+    app = load_app(HeadlessRoot(), HeadlessMessagebox())
+    work_dir = tempfile.mkdtemp(prefix='yt_harness_')
+    store = app['HistoryStore'](os.path.join(work_dir, 'download_history.db'), legacy_file=None)
+    rng = random.Random(1)
+    words = ("music live official video remix cover tutorial python cooking travel vlog review "
+             "gaming highlights news trailer lecture podcast interview concert").split()
+    formats = ["MP4 (Video + Audio)", "MP4 (Video Only)", "MP3 (Audio Only)", "MP4 (Facebook Video)"]
+    qualities = list(app['QUALITY_MAP'])
+    count = scenario['history_records']
+    started = datetime(2021, 1, 1).timestamp()
+    records = []
+    for i in range(count):
+        title = ' '.join(rng.choice(words) for _ in range(5)) + f' {i}'
+        video_id = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJ0123456789_-') for _ in range(11))
+        date = datetime.fromtimestamp(started + i * 1500).strftime("%Y-%m-%d %H:%M:%S")
+        records.append((date, f'https://www.youtube.com/watch?v={video_id}', f'{title}.mp4', title,
+                        rng.choice(formats), rng.choice(qualities), None))
+    with store.conn:
+        store.conn.executemany("INSERT INTO downloads (date, url, filename, title, format, quality, options) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+    del records
+
+    page_size = app['HISTORY_PAGE_SIZE']
+    queries = [
+        {'text': ''},
+        {'text': 'm'},
+        {'text': 'mus'},
+        {'text': 'music live'},
+        {'text': 'watch'},  # every URL
+        {'text': 'nothing matches this'},
+        {'text': '', 'date_from': datetime(2022, 3, 1), 'date_to': datetime(2022, 9, 30)},
+        {'text': '', 'format': formats[2], 'quality': qualities[2]},
+        {'text': 'official', 'format': formats[0], 'date_from': datetime(2023, 1, 1)},
+        {'text': 'watch', 'quality': qualities[0], 'date_to': datetime(2022, 12, 31)},
+    ]
+    timings = []
+    cpu_before = time.process_time()
+    for filters in queries:
+        # What typing does: count and first page, then dragging the scrollbar
+        begin = time.perf_counter()
+        total = store.count(filters)
+        store.page(filters, 0, page_size)
+        timings.append(time.perf_counter() - begin)
+        for offset in (total // 2, max(0, total - page_size)):
+            begin = time.perf_counter()
+            store.page(filters, offset, page_size)
+            timings.append(time.perf_counter() - begin)
+    cpu = time.process_time() - cpu_before
+    timings.sort()
+    return {
+        'scenario': name,
+        'ok': True,
+        'records': count,
+        'queries': len(timings),
+        'query_ms': round(timings[-1] * 1000, 2),
+        'median_query_ms': round(timings[len(timings) // 2] * 1000, 2),
+        'cpu_s': round(cpu, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource else None,
+    }
+
+
+def run_alerts_window(name, scenario):
+    """Publish events from many jobs into an open Alerts window and time its polls."""
+    root = HeadlessRoot()
+    root.winfo_x = root.winfo_y = root.winfo_width = lambda: 0
+    app = load_app(root, HeadlessMessagebox())
+    widgets = app['tk'] = app['ttk'] = HeadlessTk()
+    bus = app['event_bus']
+    # Thousands of synthetic events; the Alerts window is what is measured
+    app['log'].disabled = True
+    app['show_alerts']()
+    window, tree = widgets.windows[0], widgets.trees[0]
+    rng = random.Random(1)
+    jobs = [{'id': i, 'url': f'harness://progressive/alerts-{i}'} for i in range(1, scenario['alert_jobs'] + 1)]
+    per_batch = scenario['alert_events'] // len(jobs) * 10
+    timings = []
+    cpu_before = time.process_time()
+    for start in range(0, len(jobs), 10):
+        # Ten jobs at a time, each retrying (repeats are counted, not added) and then failing
+        running = jobs[start:start + 10]
+        for n in range(per_batch):
+            job = rng.choice(running)
+            if n % 4:
+                bus.publish('warning', "yt-dlp warning", f"Retrying fragment {n // 8}", job)
+            else:
+                bus.publish('error', "yt-dlp error", f"HTTP Error 403: Forbidden ({n})", job)
+            if n % 100 == 99:
+                begin = time.perf_counter()
+                window.pump()
+                timings.append(time.perf_counter() - begin)
+        for job in running:
+            bus.forget_job(job)
+    window.pump()
+    cpu = time.process_time() - cpu_before
+
+    # Every event the bus still holds is in the tree, under its job, with its count
+    ok = all(tree.exists(str(event['id'])) and tree.rows[str(event['id'])]['parent'] == f"job-{event['job']}"
+             and tree.rows[str(event['id'])]['values'][2] == (f"×{event['count']}" if event['count'] > 1 else "")
+             for event in bus.changed_since(0))
+    # Finished jobs are forgotten, everything shown counts as seen, and Clear All empties the tree
+    ok = ok and not bus._last_by_job and bus.unseen == 0
+    widgets.buttons["Clear All"]()
+    ok = ok and not tree.rows and not bus.changed_since(0)
+    # Closing the window stops its polling
+    widgets.buttons["Close"]()
+    window.pump()
+    ok = ok and not window.pending
+    timings.sort()
+    return {
+        'scenario': name,
+        'ok': ok,
+        'records': scenario['alert_events'],
+        'queries': len(timings),
+        'query_ms': round(timings[-1] * 1000, 2),
+        'median_query_ms': round(timings[len(timings) // 2] * 1000, 2),
+        'cpu_s': round(cpu, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource else None,
+    }
+
+
+def check_thresholds(result):
+    """Return a list of human-readable threshold violations for one result."""
+    limits = {**THRESHOLDS['default'], **THRESHOLDS.get(result['scenario'], {})}
+    failures = [] if result['ok'] else ["download failed"]
+    checks = (
+        ('mb_per_s', 'min_mb_per_s', lambda value, limit: value >= limit),
+        ('ttfb_s', 'max_ttfb_s', lambda value, limit: value <= limit),
+        ('cpu_s_per_mb', 'max_cpu_s_per_mb', lambda value, limit: value <= limit),
+        ('peak_rss_mb', 'max_peak_rss_mb', lambda value, limit: value <= limit),
+        ('callbacks_per_mb', 'max_callbacks_per_mb', lambda value, limit: value <= limit),
+        ('query_ms', 'max_query_ms', lambda value, limit: value <= limit),
+        ('http_429', 'max_http_429', lambda value, limit: value <= limit),
+    )
+    for key, limit_key, passes in checks:
+        value, limit = result.get(key), limits.get(limit_key)
+        if value is not None and limit is not None and not passes(value, limit):
+            failures.append(f"{key}={value} (limit {limit})")
+    return failures
+
+
+def main(argv):
+    if argv[:1] == ['--run-scenario']:
+        # Child process: one scenario, so peak RSS is not shared between scenarios.
+        # The app logs every event it publishes; show them before the result line
+        logging.basicConfig(level=logging.INFO, stream=sys.stdout, format="[%(levelname)s] %(message)s")
+        print(json.dumps(run_scenario(argv[1])))
+        return 0
+
+    check = '--no-check' not in argv
+    names = [arg for arg in argv if not arg.startswith('--')] or [
+        name for name, scenario in SCENARIOS.items() if not scenario.get('opt_in')]
+    failed = False
+    for name in names:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-scenario', name],
+                              capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            print(f"{name}: harness error\n{proc.stdout}{proc.stderr}")
+            failed = True
+            continue
+        if result.get('skipped'):
+            print(f"{name:<24} skip ({result['skipped']})")
+            continue
+        failures = check_thresholds(result) if check else []
+        status = "FAIL" if failures else "ok"
+        if 'query_ms' in result:
+            print(f"{name:<24} {status:<4} {result['records']:>8} records  {result['queries']} queries  "
+                  f"slowest {result['query_ms']} ms  median {result['median_query_ms']} ms  "
+                  f"rss {result['peak_rss_mb']} MB")
+        else:
+            print(f"{name:<24} {status:<4} {result['mb']:>8} MB  {result['mb_per_s']:>8} MB/s  "
+                  f"ttfb {result['ttfb_s']}s  cpu {result['cpu_s']}s  rss {result['peak_rss_mb']} MB  "
+                  f"tk callbacks {result['tk_callbacks']}")
+            if result['fragment_decisions'] or result['http_429']:
+                print(f"{'':<29} fragments {result['fragments'] or 'fixed'}  "
+                      f"{result['fragment_decisions']} decisions  {result['http_429']} throttled")
+            if result['paths_ejected']:
+                print(f"{'':<29} paths ejected: {', '.join(result['paths_ejected'])}")
+            if result['merges']:
+                print(f"{'':<29} {len(result['merges'])} merges, last {result['merges'][-1]}")
+        for failure in failures:
+            print(f"    {failure}")
+        failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))